@@ -0,0 +1,174 @@
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+
+# ---------------------------------------------------------
+# [운영 CLI] 실행 중인 봇의 /admin API 호출 (control.py)
+#  python admin.py status
+#  python admin.py jobs [--limit N]
+#  python admin.py pause | resume | poll
+#  python admin.py drain [--wait]          -> 대기열을 다 비울 때까지 기다림 (배포 전)
+#  python admin.py set job_workers=4 poll_min=5 gemini_rpm=30
+#  python admin.py retry <file_id>         -> 격리(dead)된 작업 다시 받기
+#  python admin.py drive [--local]         -> 드라이브 진단 (--local: 봇 없이 이 프로세스에서)
+#  python admin.py catalog [--reload]      -> 스타일 카탈로그 (--reload: assets 다시 읽기)
+#  주소: --url / ADMIN_URL (기본 http://127.0.0.1:ADMIN_PORT), 토큰: ADMIN_TOKEN
+# ---------------------------------------------------------
+def default_url():
+    from config import Config
+    return os.getenv("ADMIN_URL") or f"http://127.0.0.1:{Config.from_env().admin_port}"
+
+
+def request(args, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    req = urllib.request.Request(args.url.rstrip("/") + path, data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    token = os.getenv("ADMIN_TOKEN")
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=args.timeout) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        detail = e.read().decode("utf-8", "replace")
+        sys.exit(f"❌ {e.code} {path}: {detail}")
+    except urllib.error.URLError as e:
+        sys.exit(f"❌ 봇에 연결할 수 없습니다 ({args.url}): {e.reason}")
+
+
+def print_json(data):
+    print(json.dumps(data, ensure_ascii=False, indent=2))
+
+
+def print_status(status):
+    state = "일시정지" if status["paused"] else "드레인 중" if status["draining"] else "실행 중"
+    if status.get("drained"):
+        state = "드레인 완료"
+    print(f"🤖 {state} | 워커 {status['workers']} | 대기열 {status['queued']} | 처리 중 {status['in_flight']} | "
+          f"보류 {status['held']} | 완료 {status['completed']} | 실패 {status['failed']}")
+    print("⚙️ " + ", ".join(f"{k}={v}" for k, v in status["settings"].items()))
+    for name, provider in status.get("providers", {}).items():
+        print(f"   {name}: {provider['rpm']}/분, 동시 {provider['in_flight']}/{provider['concurrency_limit']}"
+              f" (최대 {provider['concurrency_max']})")
+    if status["stages"]:
+        print("⏱️ 단계별 평균/최대")
+        for name, stats in status["stages"].items():
+            print(f"   {name:<12} {stats['count']:>5}회  평균 {stats['avg']:>6.1f}s  최대 {stats['max']:>6.1f}s")
+
+
+def print_jobs(jobs):
+    def line(job):
+        timings = " | ".join(f"{k} {v:.1f}s" for k, v in job["timings"].items())
+        parts = [job["name"]]
+        if job.get("stage"):
+            parts.append(f"[{job['stage']}]")
+        if "elapsed" in job:
+            parts.append(f"{job['elapsed']}s")
+        elif "waiting" in job:
+            parts.append(f"대기 {job['waiting']}s")
+        if timings:
+            parts.append(f"({timings})")
+        if job.get("error"):
+            parts.append(f"❌ {job['error']}")
+        return "   " + " ".join(parts)
+
+    for title, key in (("⏳ 대기", "queued"), ("🔄 처리 중", "in_flight"), ("✅ 최근", "recent"), ("❌ 실패", "failed")):
+        print(f"{title} ({len(jobs[key])})")
+        for job in jobs[key]:
+            print(line(job))
+    if "dead" in jobs:
+        print(f"☠️ 격리 ({len(jobs['dead'])})")
+        for row in jobs["dead"]:
+            print(f"   {row['name']} ({row['file_id']}) {row['attempts']}회: {row['last_error']}")
+
+
+def print_catalog(catalog):
+    print(f"🎨 스타일 카탈로그 ({catalog['root']}): 조합 {catalog['routes']}개")
+    for room, styles in catalog["rooms"].items():
+        print(f"   {room}")
+        for style, variants in styles.items():
+            shown = f"{variants[0]}-{variants[-1]}" if variants else "없음"
+            print(f"      {style:<14} {len(variants):>2}장 ({shown})")
+    for problem in catalog["problems"]:
+        print(f"   ⚠️ {problem}")
+
+
+def parse_settings(pairs):
+    changes = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            sys.exit(f"❌ 이름=값 형식이어야 합니다: {pair}")
+        changes[name] = float(value) if "." in value else int(value)
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI 인테리어 봇 운영 CLI")
+    parser.add_argument("--url", default=None, help="봇 주소 (기본 ADMIN_URL 또는 http://127.0.0.1:ADMIN_PORT)")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 그대로 출력")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("status", help="스케줄러/설정/제공자 상태")
+    jobs = sub.add_parser("jobs", help="대기/처리 중/최근/실패 작업")
+    jobs.add_argument("--limit", type=int, default=50)
+    sub.add_parser("pause", help="새 작업 꺼내기 중지 (처리 중인 작업은 계속)")
+    sub.add_parser("resume", help="pause/drain 해제")
+    drain = sub.add_parser("drain", help="새 파일은 받지 않고 대기열만 소진")
+    drain.add_argument("--wait", action="store_true", help="대기열과 처리 중 작업이 모두 끝날 때까지 기다림")
+    sub.add_parser("poll", help="감시 주기를 기다리지 않고 바로 INBOX 조회")
+    settings = sub.add_parser("set", help="설정 변경 (예: job_workers=4 poll_min=5)")
+    settings.add_argument("pairs", nargs="*", help="이름=값 (비우면 현재 설정 출력)")
+    retry = sub.add_parser("retry", help="격리된 작업 다시 받기")
+    retry.add_argument("file_id")
+    drive = sub.add_parser("drive", help="드라이브 폴더 진단 (INBOX/DRAFT/ARCHIVE 병렬)")
+    drive.add_argument("--local", action="store_true", help="봇을 거치지 않고 직접 진단")
+    catalog = sub.add_parser("catalog", help="스타일 카탈로그 (공간/스타일/번호별 무드보드)")
+    catalog.add_argument("--reload", action="store_true", help="assets 폴더를 다시 읽음")
+    args = parser.parse_args()
+    args.url = args.url or default_url()
+
+    if args.command == "drive" and args.local:
+        import check_drive
+        result = check_drive.run_diagnosis()
+        sys.exit(0 if result and all(r.get("ok") for r in result["folders"].values()) else 1)
+
+    if args.command == "status":
+        result, show = request(args, "GET", "/admin/status"), print_status
+    elif args.command == "jobs":
+        result, show = request(args, "GET", f"/admin/jobs?limit={args.limit}"), print_jobs
+    elif args.command in ("pause", "resume", "drain", "poll"):
+        result, show = request(args, "POST", f"/admin/{args.command}"), print_status
+        while args.command == "drain" and args.wait and not result["drained"]:
+            time.sleep(2)
+            result = request(args, "GET", "/admin/status")
+    elif args.command == "set":
+        if args.pairs:
+            result = request(args, "POST", "/admin/settings", parse_settings(args.pairs))
+        else:
+            result = request(args, "GET", "/admin/settings")
+        show = print_json
+    elif args.command == "catalog":
+        if args.reload:
+            result = request(args, "POST", "/admin/catalog/reload")
+        else:
+            result = request(args, "GET", "/admin/catalog")
+        show = print_catalog
+    elif args.command == "retry":
+        result, show = request(args, "POST", "/admin/retry", {"file_id": args.file_id}), print_json
+    else:
+        import check_drive
+        result, show = request(args, "GET", "/admin/drive"), check_drive.print_report
+
+    if args.json:
+        print_json(result)
+    else:
+        show(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import random
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+# ---------------------------------------------------------
+# [API 호출 계층] 제공자(Gemini/매그니픽)별 속도 제한 + 오류 분류 + 재시도
+#  - 토큰 버킷: 초당 요청 수 제한
+#  - 적응형 동시성: 429를 받으면 동시 호출 수를 절반으로, 성공이 이어지면 1씩 복구
+# ---------------------------------------------------------
+API_RETRIES = REGISTRY.counter("bot_api_retries_total", "Retried external API calls", labels=("provider", "kind"))
+
+
+class RetryableError(Exception):
+    pass
+
+
+class FatalError(Exception):
+    pass
+
+
+THROTTLE = "throttle"
+RETRYABLE = "retryable"
+FATAL = "fatal"
+
+RETRYABLE_STATUS = (408, 500, 502, 503, 504)
+
+
+def _status_of(exc):
+    for attr in ("status", "code", "status_code"):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    resp = getattr(exc, "resp", None)
+    return getattr(resp, "status", None)
+
+
+def classify_error(exc):
+    if isinstance(exc, FatalError):
+        return FATAL
+    if isinstance(exc, RetryableError):
+        return RETRYABLE
+    status = _status_of(exc)
+    if status == 429:
+        return THROTTLE
+    if status in RETRYABLE_STATUS:
+        return RETRYABLE
+    if status is not None and 400 <= status < 500:
+        return FATAL  # 401 인증, 402 크레딧 부족, 400 잘못된 요청 등
+    message = str(exc).lower()
+    if "429" in message or "quota" in message or "rate limit" in message or "resource exhausted" in message:
+        return THROTTLE
+    if isinstance(exc, OSError):
+        return RETRYABLE
+    # aiohttp는 매그니픽 클라이언트를 쓸 때만 import됨 (여기서 새로 불러오지 않음)
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None and isinstance(exc, aiohttp.ClientError):
+        return RETRYABLE
+    if "timeout" in message or "unavailable" in message or "deadline" in message:
+        return RETRYABLE
+    return FATAL
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        if rate <= 0:
+            raise ValueError(f"초당 요청 수는 0보다 커야 합니다: {rate}")
+        self.rate = rate      # 초당 토큰
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError(f"초당 요청 수는 0보다 커야 합니다: {rate}")
+        with self._lock:
+            self.rate = rate
+            if burst is not None:
+                self.burst = burst
+            self._tokens = min(self._tokens, self.burst)
+
+
+class AdaptiveLimiter:
+    def __init__(self, limit, min_limit=1, max_limit=None, recover_after=5):
+        self.limit = limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit or limit
+        self.recover_after = recover_after
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.recover_after and self.limit < self.max_limit:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+    def set_max(self, max_limit):
+        with self._cond:
+            self.max_limit = max(self.min_limit, max_limit)
+            self.limit = min(self.limit, self.max_limit)
+            self._cond.notify_all()
+
+
+class Provider:
+    def __init__(self, name, rate, burst=None, concurrency=4, max_retries=4, backoff=2.0, max_backoff=60.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst if burst is not None else max(1, int(rate)))
+        self.limiter = AdaptiveLimiter(concurrency)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        REGISTRY.gauge(f"bot_{name}_concurrency_limit", f"Adaptive concurrency limit for {name}",
+                       lambda: self.limiter.limit)
+
+    def configure(self, rpm=None, concurrency=None):
+        # 운영 중 조정 (재시작 없이): 분당 요청 수 / 최대 동시 호출 수
+        if rpm is not None and rpm <= 0:
+            raise ValueError(f"{self.name} rpm은 0보다 커야 합니다: {rpm}")
+        if concurrency is not None and concurrency < 1:
+            raise ValueError(f"{self.name} 동시 호출 수는 1 이상이어야 합니다: {concurrency}")
+        if rpm is not None:
+            self.bucket.set_rate(rpm / 60.0)
+        if concurrency is not None:
+            self.limiter.set_max(concurrency)
+
+    def settings(self):
+        return {"rpm": round(self.bucket.rate * 60, 2), "concurrency_max": self.limiter.max_limit,
+                "concurrency_limit": self.limiter.limit, "in_flight": self.limiter.in_flight}
+
+    def call(self, fn, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            try:
+                with self.limiter.slot():
+                    result = fn(*args, **kwargs)
+            except Exception as e:
+                kind = classify_error(e)
+                if kind == THROTTLE:
+                    self.limiter.on_throttle()
+                if kind == FATAL or attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                API_RETRIES.inc(provider=self.name, kind=kind)
+                delay = min(self.max_backoff, self.backoff * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0)
+                print(f" ({self.name} {kind}, {delay:.1f}초 후 재시도 {attempt}/{self.max_retries})", end="", flush=True)
+                time.sleep(delay)
+                continue
+            self.limiter.on_success()
+            return result
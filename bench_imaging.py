@@ -0,0 +1,158 @@
+import argparse
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+# ---------------------------------------------------------
+# [벤치마크] 이미지 표준화: 기존 방식(legacy) vs imaging 모듈(pillow / vips)
+#  - 12~48MP 휴대폰 사진 크기의 합성 JPEG 코퍼스
+#  - (백엔드, 화소수) 조합마다 별도 프로세스 (최대 RSS가 섞이지 않도록)
+# ---------------------------------------------------------
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_PREFIX = "BENCH_RESULT "
+BACKENDS = ("legacy", "pillow", "vips")
+
+
+def legacy_standardize(data):
+    # 이전 bot.standardize_image (비교 기준)
+    from PIL import Image, ImageOps
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB': img = img.convert('RGB')
+        img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=95)
+    return buf.getvalue()
+
+
+def make_corpus(folder, megapixels, count):
+    # 코퍼스 생성은 메모리를 많이 쓰므로 부모 프로세스에서 파일로 만들어 둠
+    sys.path.insert(0, REPO_DIR)
+    from PIL import Image
+    from fakes import make_test_jpeg
+
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    paths = []
+    for n in range(count):
+        data = make_test_jpeg(width, height, seed=n)
+        if n % 2:
+            # 세로로 찍은 사진처럼 EXIF 회전값(6) 추가
+            with Image.open(io.BytesIO(data)) as img:
+                exif = img.getexif()
+                exif[0x0112] = 6
+                buf = io.BytesIO()
+                img.save(buf, "JPEG", quality=90, exif=exif)
+            data = buf.getvalue()
+        path = os.path.join(folder, f"{megapixels:g}mp_{n}.jpg")
+        with open(path, "wb") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def peak_rss_kb():
+    # ru_maxrss는 fork한 부모의 최대값을 물려받으므로 exec 후 초기화되는 VmHWM 우선
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run_single(args):
+    sys.path.insert(0, REPO_DIR)
+    import imaging
+
+    if args.backend == "legacy":
+        fn = legacy_standardize
+    else:
+        try:
+            imaging.set_backend(args.backend)
+        except (ImportError, OSError) as e:
+            print(RESULT_PREFIX + json.dumps({"backend": args.backend, "skipped": str(e)}))
+            return
+        fn = imaging.standardize
+
+    corpus = []
+    for path in args.files:
+        with open(path, "rb") as f:
+            corpus.append(f.read())
+    base_rss = peak_rss_kb()
+    fn(corpus[0])  # 워밍업
+    samples = []
+    out_bytes = 0
+    for data in corpus:
+        start = time.perf_counter()
+        out = fn(data)
+        samples.append(time.perf_counter() - start)
+        out_bytes += len(out)
+    samples.sort()
+    result = {
+        "backend": args.backend,
+        "megapixels": args.megapixels,
+        "input_mb": round(sum(map(len, corpus)) / len(corpus) / 1024 / 1024, 1),
+        "count": len(corpus),
+        "mean_ms": round(sum(samples) / len(samples) * 1000, 1),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1),
+        "rss_spike_mb": round((peak_rss_kb() - base_rss) / 1024, 1),
+        "avg_out_kb": round(out_bytes / len(corpus) / 1024, 1),
+    }
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+def run_suite(args):
+    results = []
+    workspace = tempfile.mkdtemp(prefix="bench_imaging_")
+    for megapixels in args.megapixels_list:
+        print(f"\n📷 {megapixels:g}MP x {args.count}장")
+        paths = make_corpus(workspace, megapixels, args.count)
+        for backend in args.backends:
+            cmd = [
+                sys.executable, os.path.abspath(__file__), "--single",
+                "--backend", backend, "--megapixels", str(megapixels), "--files", *paths,
+            ]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+            if not lines:
+                print(f"   ❌ {backend} 실행 실패\n{proc.stderr[-2000:]}")
+                continue
+            result = json.loads(lines[-1][len(RESULT_PREFIX):])
+            if "skipped" in result:
+                print(f"   {backend:<8} 건너뜀 ({result['skipped']})")
+                continue
+            results.append(result)
+            print(f"   {backend:<8} 평균 {result['mean_ms']:>7.1f}ms  p95 {result['p95_ms']:>7.1f}ms  "
+                  f"RSS +{result['rss_spike_mb']}MB  출력 {result['avg_out_kb']}KB")
+    shutil.rmtree(workspace, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="이미지 표준화 벤치마크")
+    parser.add_argument("--megapixels-list", type=float, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--count", type=int, default=6, help="화소수별 이미지 수")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--megapixels", type=float, help=argparse.SUPPRESS)
+    parser.add_argument("--files", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args)
+    else:
+        run_suite(args)
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+import os
+import time
+
+from fake_magnific import FakeMagnific, MODES
+from magnific_client import MagnificClient, MagnificError, WebhookReceiver
+
+# ---------------------------------------------------------
+# [벤치마크] 가짜 매그니픽 서버로 업스케일 클라이언트 처리량 측정 (네트워크 X)
+# ---------------------------------------------------------
+async def run_case(mode, count, image_bytes, webhook=False, queue_polls=2, poll_initial=0.05):
+    fake = FakeMagnific(mode=mode, queue_polls=queue_polls)
+    runner = await fake.start()
+    receiver = WebhookReceiver(host="127.0.0.1", port=8091) if webhook else None
+    client = MagnificClient("fake-key", endpoint=fake.endpoint, poll_initial=poll_initial,
+                            poll_max=0.5, timeout=30, webhook=receiver)
+    try:
+        async with client:
+            start = time.perf_counter()
+            results = await client.upscale_many([image_bytes] * count)
+            elapsed = time.perf_counter() - start
+    finally:
+        await runner.cleanup()
+
+    ok = sum(1 for r in results if not isinstance(r, BaseException))
+    errors = {}
+    for r in results:
+        if isinstance(r, MagnificError):
+            errors[r.status or "error"] = errors.get(r.status or "error", 0) + 1
+    label = f"{mode}{' +webhook' if webhook else ''}"
+    print(
+        f"{label:<18} {count:>4}건 {elapsed:6.2f}s  {count / elapsed:7.1f}건/s  "
+        f"성공 {ok}  에러 {errors or '-'}  요청 {fake.requests}"
+    )
+
+
+async def main(count, size):
+    image_bytes = os.urandom(size)
+    for mode in MODES:
+        await run_case(mode, count, image_bytes)
+    await run_case("queued", count, image_bytes, webhook=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="매그니픽 클라이언트 처리량 벤치마크")
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--size", type=int, default=512 * 1024, help="가짜 이미지 크기(bytes)")
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.size))
@@ -0,0 +1,172 @@
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# ---------------------------------------------------------
+# [벤치마크] 가짜 Gemini/매그니픽/드라이브로 bot.py 전체 파이프라인 처리량 측정
+#  - 크레딧/네트워크 사용 없음
+#  - 인박스 크기별로 별도 프로세스에서 실행 (RSS/디스크 측정이 서로 섞이지 않도록)
+# ---------------------------------------------------------
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round((len(values) - 1) * pct / 100)))]
+
+
+def dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def stage_latencies(log_path):
+    samples = {}
+    if not os.path.exists(log_path):
+        return {}
+    with open(log_path, encoding="utf-8") as f:
+        for line in f:
+            event = json.loads(line)
+            if event.get("event") == "stage":
+                samples.setdefault(event["stage"], []).append(event["seconds"])
+    return {
+        stage: {"n": len(v), "p50": round(percentile(v, 50), 3), "p95": round(percentile(v, 95), 3)}
+        for stage, v in sorted(samples.items())
+    }
+
+
+def run_single(args):
+    workspace = tempfile.mkdtemp(prefix="bench_bot_")
+    log_path = os.path.join(workspace, "logs", "events.jsonl")
+    os.environ.update({
+        "ASSETS_DIR": os.path.join(REPO_DIR, "assets"),
+        "METRICS_LOG": log_path,
+        "JOB_WORKERS": str(args.job_workers),
+        "VARIANT_WORKERS": str(args.variant_workers),
+        # 가짜 백엔드는 속도 제한이 없으므로 호출 제한이 병목이 되지 않게
+        "GEMINI_RPM": "6000",
+        "MAGNIFIC_RPM": "6000",
+    })
+    os.chdir(workspace)
+    sys.path.insert(0, REPO_DIR)
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        import bot
+        import fakes
+
+        drive = fakes.FakeDrive(latency=args.drive_latency)
+        _, upscaler = fakes.start_fake_upscaler(args.magnific_mode)
+        bot.set_backends(
+            drive=drive,
+            model_factory=lambda name: fakes.FakeGeminiModel(name, delay=args.gemini_delay),
+            upscaler=upscaler,
+        )
+
+        # 입력 사진 (megapixels 기준 4:3) - 빈 방 캐시에 걸리지 않도록 파일마다 다른 이미지
+        width = int((args.megapixels * 1e6 * 4 / 3) ** 0.5)
+        height = width * 3 // 4
+        for n in range(args.single):
+            photo = fakes.make_test_jpeg(width, height, seed=n)
+            name = f"bench{n}_livingroom_modern_{n % 10 + 1}_origin.jpg"
+            drive.add_file(name, photo, parents=[bot.ID_INBOX])
+
+        peak_disk = [0]
+        stop = threading.Event()
+
+        def sample_disk():
+            while not stop.is_set():
+                peak_disk[0] = max(peak_disk[0], dir_size(workspace))
+                stop.wait(0.25)
+        threading.Thread(target=sample_disk, daemon=True).start()
+
+        scheduler = bot.build_scheduler(drive)
+        scheduler.start_workers()
+        start = time.perf_counter()
+        deadline = start + args.timeout
+        while time.perf_counter() < deadline:
+            scheduler.poll_once()
+            archived = len(drive.in_folder(bot.ID_ARCHIVE))
+            dead = len(bot.LEDGER.list_jobs(status="dead"))
+            if archived + dead >= args.single:
+                break
+            time.sleep(0.2)
+        elapsed = time.perf_counter() - start
+        stop.set()
+
+    archived = len(drive.in_folder(bot.ID_ARCHIVE))
+    result = {
+        "inbox": args.single,
+        "archived": archived,
+        "renders": len(drive.in_folder(bot.ID_DRAFT)),
+        "seconds": round(elapsed, 2),
+        "photos_per_min": round(archived / elapsed * 60, 2) if elapsed else 0,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_disk_mb": round(peak_disk[0] / 1024 / 1024, 1),
+        "stages": stage_latencies(log_path),
+    }
+    print(RESULT_PREFIX + json.dumps(result))
+
+
+def run_suite(args):
+    results = []
+    for size in args.inbox:
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--single", str(size),
+            "--gemini-delay", str(args.gemini_delay), "--magnific-mode", args.magnific_mode,
+            "--drive-latency", str(args.drive_latency), "--megapixels", str(args.megapixels),
+            "--job-workers", str(args.job_workers), "--variant-workers", str(args.variant_workers),
+            "--timeout", str(args.timeout),
+        ]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(RESULT_PREFIX)]
+        if not lines:
+            print(f"❌ 인박스 {size}장 실행 실패\n{proc.stderr[-2000:]}")
+            continue
+        result = json.loads(lines[-1][len(RESULT_PREFIX):])
+        results.append(result)
+
+        print(f"\n📊 인박스 {size}장: {result['archived']}장 처리 / {result['renders']}장 렌더 "
+              f"({result['seconds']}s, {result['photos_per_min']}장/분, "
+              f"RSS {result['peak_rss_mb']}MB, 디스크 {result['peak_disk_mb']}MB)")
+        for stage, s in result["stages"].items():
+            print(f"   {stage:<20} n={s['n']:<4} p50 {s['p50']:>7.3f}s  p95 {s['p95']:>7.3f}s")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bot.py 파이프라인 오프라인 벤치마크")
+    parser.add_argument("--inbox", type=int, nargs="+", default=[5, 20], help="인박스 크기 (여러 개 가능)")
+    parser.add_argument("--gemini-delay", type=float, default=0.5, help="가짜 Gemini 응답 지연(초)")
+    parser.add_argument("--magnific-mode", choices=("immediate", "queued"), default="queued")
+    parser.add_argument("--drive-latency", type=float, default=0.02, help="가짜 드라이브 요청 지연(초)")
+    parser.add_argument("--megapixels", type=float, default=12)
+    parser.add_argument("--job-workers", type=int, default=2)
+    parser.add_argument("--variant-workers", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        run_single(args)
+    else:
+        run_suite(args)
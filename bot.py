@@ -1,112 +1,248 @@
 import os
+import io
+import json
 import time
-import shutil
-import base64
-import uuid
-import re
-import requests
-import google.generativeai as genai
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload, MediaFileUpload
-from google.oauth2 import service_account
-from PIL import Image, ImageOps
-from styles_config import STYLES
-from dotenv import load_dotenv
+import hashlib
+import threading
 
-# ---------------------------------------------------------
-# [설정] 구글 드라이브 폴더 ID (여기에 다시 넣어주세요!)
-# ---------------------------------------------------------
-ID_INBOX   = '1cYHh2k40_vyasnu__LbesA4WwAJOsSFo'
-ID_DRAFT   = '1qMKhGRMXNHK98d7dIPLzandxCv6eEESt'
-ID_ARCHIVE = '1MumtL0X8FslSW2r-oh7B2NMmJGsmCLeU'  # 처리된 원본 보관용
+_IMPORT_STARTED = time.perf_counter()
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from contextlib import contextmanager
+from api_clients import FatalError, Provider
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+import imaging
+from config import Config, Lazy
+from control import ControlPlane
+from scheduler import JobScheduler
+from style_catalog import StyleCatalog, UnknownStyle
+from disk_cache import DiskCache, make_key
+from drive_batch import DriveBatcher, build_shared_service
+from drive_watcher import InboxWatcher, find_outputs
+from job_ledger import JobLedger
+from leases import LeaseLost, LeaseManager, make_lease_backend
+from memory_budget import MemoryBudget
+from metrics import (API_CALLS, API_FAILURES, BYTES, REGISTRY, log_event, set_event_log, start_admin_server,
+                     start_metrics_server, timed)
+from moodboards import load_moodboard, set_cache_size as set_moodboard_cache_size
+from quality import QualityFilter
+# google.generativeai(~1초), aiohttp/매그니픽 클라이언트는 처음 쓸 때 import (시작 시간 단축)
 
 # ---------------------------------------------------------
-# [설정] 구글 서비스 계정 키 파일 찾기 (로컬/Render 겸용)
+# [설정] 환경 변수 / .env / 서비스 계정 경로 (config.py에서 한 번만 읽음)
 # ---------------------------------------------------------
-# 1. 같은 폴더에 있는지 확인 (로컬 개발용)
-if os.path.exists('service_account.json'):
-    SERVICE_ACCOUNT_FILE = 'service_account.json'
-# 2. Render 비밀 폴더에 있는지 확인 (Render 서버용)
-elif os.path.exists('/etc/secrets/service_account.json'):
-    SERVICE_ACCOUNT_FILE = '/etc/secrets/service_account.json'
-else:
-    # 파일이 없으면 에러 발생시키지 말고 로그만 남김
-    print("🚨 [비상] service_account.json 파일을 찾을 수 없습니다!")
-    print("   -> Render 설정의 'Secret Files'에 파일을 등록했는지 확인하세요.")
-    SERVICE_ACCOUNT_FILE = None
-
-# AI 모델 설정
-load_dotenv()
-NANOBANANA_API_KEY = os.getenv("NANOBANANA_API_KEY")
-MAGNIFIC_API_KEY = os.getenv("MAGNIFIC_API_KEY")
-MAGNIFIC_ENDPOINT = "https://api.freepik.com/v1/ai/image-upscaler"
-MODEL_NAME = 'gemini-3-pro-image-preview'
-
-if NANOBANANA_API_KEY:
-    genai.configure(api_key=NANOBANANA_API_KEY)
-
-# 작업 임시 폴더
-WORK_DIR = "temp_work"
-os.makedirs(WORK_DIR, exist_ok=True)
-os.makedirs("assets", exist_ok=True)
+CONFIG = Config.from_env()
+# import 시점에는 환경 변수를 읽지 않는 모듈들 -> .env까지 읽은 CONFIG 값을 여기서 한 번에 적용
+imaging.configure(CONFIG.image_target_size, CONFIG.image_draft_gap, CONFIG.image_backend)
+set_moodboard_cache_size(CONFIG.moodboard_cache_mb)
+set_event_log(CONFIG.metrics_log)
+
+ID_INBOX   = CONFIG.id_inbox
+ID_DRAFT   = CONFIG.id_draft
+ID_ARCHIVE = CONFIG.id_archive  # 처리된 원본 보관용
+INBOX_DRIVE_ID = CONFIG.inbox_drive_id
+MODEL_NAME = CONFIG.model_name
+
+# 제공자별 호출 제한 (분당 요청 수 / 최대 동시 호출 수) - 429를 받으면 동시 호출 수를 자동으로 줄임
+GEMINI = Provider(
+    "gemini",
+    rate=CONFIG.gemini_rpm / 60,
+    burst=CONFIG.gemini_concurrency,
+    concurrency=CONFIG.gemini_concurrency,
+)
+MAGNIFIC = Provider(
+    "magnific",
+    rate=CONFIG.magnific_rpm / 60,
+    burst=CONFIG.magnific_concurrency,
+    concurrency=CONFIG.magnific_concurrency,
+)
+
+# 변형 생성 설정 (동시 실행 수는 Gemini/Freepik 속도 제한에 맞춰 조절)
+VARIANT_COUNT = CONFIG.variant_count
+VARIANT_WORKERS = CONFIG.variant_workers
+# 투기적 생성: VARIANT_COUNT보다 크면 그만큼 동시에 요청하고 먼저 도착한 정상 결과 VARIANT_COUNT장만 사용
+SPECULATIVE_VARIANTS = CONFIG.speculative_variants
+SPECULATIVE_MAX_CANDIDATES = CONFIG.speculative_max_candidates
+# 업스케일 전 로컬 품질 검사 (빈 이미지 / 빈 방 그대로 / 무드보드 복사 / 중복)
+QUALITY_FILTER = CONFIG.quality_filter
+QUALITY_MIN_DISTANCE = CONFIG.quality_min_distance
+VARIANT_CANDIDATES = REGISTRY.counter(
+    "bot_variant_candidates_total", "Furnish candidates by outcome", labels=("result",))
+
+# 작업 스케줄러 설정 (동시에 처리할 INBOX 파일 수, 감시 주기 최소/최대)
+JOB_WORKERS = CONFIG.job_workers
+POLL_INTERVAL = CONFIG.poll_interval
+POLL_INTERVAL_MAX = CONFIG.poll_interval_max
+BATCH_FLUSH_INTERVAL = 2.0  # 보관함 이동 요청을 모으는 시간(초)
+
+# 작업 장부 (단계별 결과 저장 -> 재시작 시 이어서 처리, 실패는 N회까지만 재시도)
+LEDGER = Lazy(lambda: JobLedger(max_attempts=CONFIG.job_max_attempts))
+
+# 여러 인스턴스 동시 운영: 파일마다 lease를 잡은 인스턴스만 처리
+#  LEASE_BACKEND = none(단일 인스턴스, 기본) | drive(입력 파일 appProperties) | sqlite(같은 호스트)
+LEASES = Lazy(lambda: LeaseManager(
+    make_lease_backend(CONFIG.lease_backend, get_drive_service),
+    ttl=CONFIG.lease_ttl,
+))
+
+# 메모리 예산: 동시에 메모리에 올릴 이미지 바이트 총량 (512MB 인스턴스 기준) - 차면 워커가 대기
+MEMORY_BUDGET = MemoryBudget(CONFIG.memory_budget_mb * 1024 * 1024)
+GEMINI_RESPONSE_ESTIMATE = 4 * 1024 * 1024   # Gemini 응답 이미지 1장 (inline_data)
+UPSCALE_MEMORY_FACTOR = 4                    # 2배 업스케일 결과(약 4배) - 업로드가 끝날 때까지 유지
+DEFAULT_DOWNLOAD_ESTIMATE = 16 * 1024 * 1024 # 드라이브가 크기를 안 알려줄 때
+
+# 드라이브 전송 설정 (이미지는 디스크를 거치지 않고 메모리 버퍼로 주고받음)
+DOWNLOAD_CHUNK_SIZE = 16 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+RESUMABLE_UPLOAD_THRESHOLD = 5 * 1024 * 1024  # 이보다 크면(2x 업스케일 결과) 이어올리기 업로드
+
+ASSETS_DIR = CONFIG.assets_dir
+# (공간, 스타일, 번호) -> 무드보드 + 프롬프트 (FURNISH_PROMPT 뒤에 스타일 조각을 붙여 미리 만들어 둠)
+CATALOG = Lazy(lambda: StyleCatalog(ASSETS_DIR, base_prompt=FURNISH_PROMPT,
+                                    check_interval=CONFIG.catalog_check_interval))
+JOBS_REJECTED = REGISTRY.counter("bot_jobs_rejected_total", "Inbox files rejected before download")
+
+# 빈 방(1단계) 결과 캐시: 표준화된 입력 + 프롬프트 + 모델 기준
+# (프롬프트 외의 처리 방식이 바뀌면 VERSION을 올려서 기존 캐시 무효화)
+EMPTY_ROOM_CACHE_VERSION = "v1"
+EMPTY_ROOM_CACHE = Lazy(lambda: DiskCache(
+    CONFIG.empty_room_cache_dir,
+    max_bytes=CONFIG.empty_room_cache_mb * 1024 * 1024,
+    suffix=".jpg",
+))
+
+# 가구 배치(2단계) 결과 캐시: 빈 방 + 무드보드 + 프롬프트 + 모델 + 변형 번호 기준
+RENDER_CACHE_VERSION = "v1"
+RENDER_CACHE = Lazy(lambda: DiskCache(
+    CONFIG.render_cache_dir,
+    max_bytes=CONFIG.render_cache_mb * 1024 * 1024,
+    suffix=".jpg",
+    ttl=CONFIG.render_cache_ttl_hours * 3600,
+))
+# 업스케일(3단계) 결과 캐시: 입력 이미지 + 매그니픽 요청 파라미터 기준
+UPSCALE_CACHE = Lazy(lambda: DiskCache(
+    CONFIG.upscale_cache_dir,
+    max_bytes=CONFIG.upscale_cache_mb * 1024 * 1024,
+    suffix=".jpg",
+    ttl=CONFIG.upscale_cache_ttl_hours * 3600,
+))
 
 # ---------------------------------------------------------
 # [기능 1] 구글 드라이브 연동 (공유 드라이브 옵션 추가됨)
 # ---------------------------------------------------------
+# 모든 스레드가 공유하는 service 1개 (요청마다 별도 AuthorizedHttp 사용 -> 스레드 안전)
+_drive_service = None
+_drive_lock = threading.Lock()
+
 def get_drive_service():
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE, scopes=['https://www.googleapis.com/auth/drive']
-    )
-    return build('drive', 'v3', credentials=creds)
+    global _drive_service
+    with _drive_lock:
+        if _drive_service is None:
+            from google.oauth2 import service_account
+            if not CONFIG.service_account_file:
+                raise RuntimeError("service_account.json 파일을 찾을 수 없습니다")
+            creds = service_account.Credentials.from_service_account_file(
+                CONFIG.service_account_file, scopes=['https://www.googleapis.com/auth/drive']
+            )
+            _drive_service = build_shared_service(creds)
+    return _drive_service
 
-def list_new_files(service, folder_id):
-    # [수정] 공유 드라이브 검색 옵션 추가
-    # mimeType 필터 제거 (모든 파일 감지 후 내부에서 거름)
-    query = f"'{folder_id}' in parents and trashed = false"
-    
-    results = service.files().list(
-        q=query, 
-        fields="files(id, name, mimeType)",
-        supportsAllDrives=True,         # <--- 추가됨
-        includeItemsFromAllDrives=True  # <--- 추가됨
-    ).execute()
-    
-    # 이미지 파일만 필터링
-    all_files = results.get('files', [])
-    image_files = [f for f in all_files if 'image' in f.get('mimeType', '')]
-    return image_files
+# 보관함 이동 등은 여러 작업 것을 모아서 batch 요청 1번으로 처리
+_drive_batcher = None
+
+def get_drive_batcher():
+    global _drive_batcher
+    service = get_drive_service()
+    with _drive_lock:
+        if _drive_batcher is None:
+            _drive_batcher = DriveBatcher(service, flush_interval=BATCH_FLUSH_INTERVAL).start()
+    return _drive_batcher
 
-def download_file(service, file_id, local_path):
+@timed("drive_download")
+def download_file(service, file_id):
     # 다운로드는 ID 기반이라 옵션 불필요하지만 안전하게 get 호출
     request = service.files().get_media(fileId=file_id)
-    with open(local_path, "wb") as fh:
-        downloader = MediaIoBaseDownload(fh, request)
-        done = False
-        while done is False:
-            status, done = downloader.next_chunk()
+    fh = io.BytesIO()
+    downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+    done = False
+    # 메모리 예산은 작업 단위 예약(render_job)에 포함
+    while done is False:
+        status, done = downloader.next_chunk()
+    API_CALLS.inc(provider="drive", operation="download")
+    BYTES.inc(fh.tell(), provider="drive", direction="in")
+    return fh.getvalue()
+
+class ViewReader(io.RawIOBase):
+    # bytes/memoryview를 복사하지 않고 읽는 스트림 (io.BytesIO(memoryview)는 통째로 복사함)
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def readinto(self, b):
+        chunk = self._view[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
 
-def upload_file(service, local_path, folder_id, file_name):
+@timed("drive_upload")
+def upload_file(service, data, folder_id, file_name, app_properties=None):
     print(f"   📤 업로드 중: {file_name}...", end="", flush=True)
     file_metadata = {'name': file_name, 'parents': [folder_id]}
-    media = MediaFileUpload(local_path, mimetype='image/jpeg')
+    if app_properties:
+        # 결과물에 작업 키/변형 번호를 남겨 재실행 시 중복 생성을 막음
+        file_metadata['appProperties'] = app_properties
+    resumable = len(data) > RESUMABLE_UPLOAD_THRESHOLD
+    media = MediaIoBaseUpload(
+        ViewReader(data), mimetype='image/jpeg',
+        chunksize=UPLOAD_CHUNK_SIZE, resumable=resumable
+    )
     
     # [수정] 공유 드라이브 업로드 옵션 추가
-    service.files().create(
+    request = service.files().create(
         body=file_metadata, 
         media_body=media, 
         fields='id',
         supportsAllDrives=True  # <--- 추가됨
-    ).execute()
+    )
+    if resumable:
+        response = None
+        while response is None:
+            status, response = request.next_chunk()
+    else:
+        response = request.execute()
+    API_CALLS.inc(provider="drive", operation="upload")
+    BYTES.inc(len(data), provider="drive", direction="out")
     print(" 완료!")
+    return response.get('id')
 
-def move_file_to_archive(service, file_id, old_folder_id, new_folder_id):
-    # [수정] 공유 드라이브 이동 옵션 추가
-    service.files().update(
-        fileId=file_id,
-        addParents=new_folder_id,
-        removeParents=old_folder_id,
-        supportsAllDrives=True  # <--- 추가됨
-    ).execute()
+def archive_job(job, lease=None):
+    # 이동이 실제로 끝날 때까지 같은 파일이 다시 대기열에 들어가지 않도록 잡아둠 (lease도 그때까지 유지)
+    job.hold()
+    def on_error(exc):
+        if lease:
+            lease.release()
+        job.release()
+    def on_success(response):
+        print(f"✅ 원본 파일 이동 완료: {job.name}")
+        LEDGER.mark_done(job.file_id)
+        if lease:
+            lease.release()
+        job.release()
+    get_drive_batcher().move_file(job.file_id, ID_INBOX, ID_ARCHIVE, on_success=on_success, on_error=on_error)
 
 # ---------------------------------------------------------
 # [기능 2] 파일명 파싱
@@ -115,9 +251,10 @@ def parse_filename(filename):
     name_no_ext = os.path.splitext(filename)[0]
     parts = name_no_ext.split('_')
     
+    # 공간/스타일을 알 수 없으면 None (기본 스타일로 대체하지 않고 카탈로그에서 거절)
     info = {
-        "customer": "unknown", "room": "livingroom", 
-        "style": "modern", "variant": "1", "suffix": "origin"
+        "customer": "unknown", "room": None,
+        "style": None, "variant": "1", "suffix": "origin"
     }
     
     if len(parts) >= 5:
@@ -133,281 +270,663 @@ def parse_filename(filename):
     
     return info
 
-def find_moodboard(room, style, variant):
-    safe_room = room.lower().replace(" ", "")
-    safe_style = style.lower().replace(" ", "-").replace("_", "-")
-    target_dir = os.path.join("assets", safe_room, safe_style)
-    
-    if os.path.exists(target_dir):
-        for f in os.listdir(target_dir):
-            if f.lower().endswith(('.png', '.jpg')):
-                if variant in re.findall(r'\d+', f):
-                    return os.path.join(target_dir, f)
-        files = [f for f in os.listdir(target_dir) if f.lower().endswith(('.png', '.jpg'))]
-        if files: return os.path.join(target_dir, files[0])
-    return None
+def make_job_key(file, info):
+    # 같은 사진(md5) + 같은 주문 정보면 같은 작업 -> 파일 ID가 달라도 결과물을 재사용
+    content = file.get('md5Checksum') or file['id']
+    parts = [content, info['customer'], info['room'], info['style'], info['variant']]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:40]
+
+def find_existing_outputs(service, job_key):
+    # {변형 번호: drive 파일 ID} - DRAFT 폴더에 이미 올라간 결과물
+    existing = {}
+    for f in find_outputs(service, ID_DRAFT, job_key):
+        variant = f.get('appProperties', {}).get('variant', '')
+        if variant.isdigit():
+            existing[int(variant)] = f['id']
+    return existing
+
+_job_key_locks = {}  # job_key -> [Lock, 기다리거나 잡고 있는 작업 수]
+_job_key_locks_guard = threading.Lock()
+
+@contextmanager
+def job_key_lock(job_key):
+    # 같은 사진이 동시에 두 번 들어와도 한 번만 렌더 (두 번째는 첫 번째 결과를 재사용)
+    # 마지막 작업이 끝나면 항목을 지움 (작업 키마다 쌓이지 않도록)
+    with _job_key_locks_guard:
+        entry = _job_key_locks.setdefault(job_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _job_key_locks_guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _job_key_locks[job_key]
+
+def route_job(info):
+    # 카탈로그에 없는 조합이면 UnknownStyle
+    return CATALOG.resolve(info['room'], info['style'], info['variant'])
+
+def reject_file(file, error):
+    # 다운로드 전에 격리 (INBOX에 그대로 두고, 파일명을 고치면 다음 조회 때 다시 시도)
+    print(f"\n🚫 처리할 수 없는 파일 (격리): {file['name']} - {error}")
+    LEDGER.reject(file['id'], file['name'], error)
+    JOBS_REJECTED.inc()
+    log_event("rejected", file=file['name'], file_id=file['id'], reason=str(error))
 
 # ---------------------------------------------------------
 # [기능 3] AI 생성 코어
 # ---------------------------------------------------------
-def standardize_image(image_path):
-    try:
-        with Image.open(image_path) as img:
-            img = ImageOps.exif_transpose(img)
-            if img.mode != 'RGB': img = img.convert('RGB')
-            img.thumbnail((1920, 1080), Image.Resampling.LANCZOS)
-            img.save(image_path, "JPEG", quality=95)
-        return image_path
-    except: return image_path
-
-def generate_empty_room(image_path):
+@timed("standardize")
+def standardize_image(data):
+    # imaging.TARGET_SIZE(기본 1920x1080) 이내 RGB JPEG로 맞춤 (이미 규격이면 그대로) - 깨진 이미지는 ImageError
+    with MEMORY_BUDGET.reserve(imaging.estimate_memory(data)):
+        return imaging.standardize(data)
+
+def jpeg_blob(data):
+    # Gemini 입력용 (PIL 객체로 넘기면 라이브러리 안에서 다시 인코딩함)
+    return {"mime_type": "image/jpeg", "data": data}
+
+def _generate_image_once(contents, operation):
+    API_CALLS.inc(provider="gemini", operation=operation)
+    response = get_model().generate_content(contents)
+    for part in response.parts or []:
+        if hasattr(part, 'inline_data') and part.inline_data:
+            return part.inline_data.data
+    # 텍스트만/거절 응답: 같은 요청을 다시 보내도 과금만 되므로 재시도하지 않음
+    # (변형은 다음 작업 시도에서, 추측 실행은 추가 후보로 대신 채움)
+    raise FatalError("응답에 이미지 없음")
+
+def generate_image(contents, operation):
+    # 속도 제한(토큰 버킷 + 적응형 동시성) 안에서 호출, 일시적 오류/429는 백오프 후 재시도
+    with MEMORY_BUDGET.reserve(GEMINI_RESPONSE_ESTIMATE):
+        return GEMINI.call(_generate_image_once, contents, operation)
+
+EMPTY_ROOM_PROMPT = (
+    "IMAGE EDITING TASK (STRICT):\n"
+    "Create a photorealistic image of this room but completely EMPTY.\n"
+    "ACTIONS:\n"
+    "1. REMOVE ALL furniture, rugs, decor, and lighting.\n"
+    "2. REMOVE ALL window treatments (curtains, blinds). Show bare windows.\n"
+    "3. KEEP the original floor, walls, ceiling, and windows EXACTLY as they are.\n"
+    "4. IN-PAINT the removed areas seamlessly.\n"
+    "OUTPUT RULE: Return ONLY the generated image."
+)
+
+@timed("gemini_empty_room")
+def generate_empty_room(image_bytes):
     print("   🔨 [1단계] 빈 방 만드는 중...", end="", flush=True)
     try:
-        img = Image.open(image_path)
-        prompt = (
-            "IMAGE EDITING TASK (STRICT):\n"
-            "Create a photorealistic image of this room but completely EMPTY.\n"
-            "ACTIONS:\n"
-            "1. REMOVE ALL furniture, rugs, decor, and lighting.\n"
-            "2. REMOVE ALL window treatments (curtains, blinds). Show bare windows.\n"
-            "3. KEEP the original floor, walls, ceiling, and windows EXACTLY as they are.\n"
-            "4. IN-PAINT the removed areas seamlessly.\n"
-            "OUTPUT RULE: Return ONLY the generated image."
-        )
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content([prompt, img])
+        # 같은 사진이 다른 스타일로 다시 들어오면 1단계를 건너뜀
+        cache_key = make_key(image_bytes, EMPTY_ROOM_PROMPT, MODEL_NAME, EMPTY_ROOM_CACHE_VERSION)
+        cached = EMPTY_ROOM_CACHE.get(cache_key)
+        if cached is not None:
+            print(" 완료 (캐시)!")
+            return cached
         
-        if response.parts:
-            for part in response.parts:
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    output_path = os.path.join(WORK_DIR, "temp_empty.jpg")
-                    with open(output_path, 'wb') as f: f.write(part.inline_data.data)
-                    print(" 완료!")
-                    return standardize_image(output_path)
-    except Exception as e: print(f" 실패 ({e})")
+        data = generate_image([EMPTY_ROOM_PROMPT, jpeg_blob(image_bytes)], "empty_room")
+        print(" 완료!")
+        empty_bytes = standardize_image(data)
+        EMPTY_ROOM_CACHE.put(cache_key, empty_bytes)
+        return empty_bytes
+    except Exception as e:
+        API_FAILURES.inc(provider="gemini", reason=type(e).__name__)
+        print(f" 실패 ({e})")
     return None
 
-def generate_furnished(empty_path, moodboard_path):
+FURNISH_PROMPT = (
+    "IMAGE GENERATION TASK (Virtual Staging):\n"
+    "Furnish the empty room using the furniture styles shown in the Moodboard.\n\n"
+
+    "<CRITICAL: STRUCTURAL PRESERVATION>\n"
+    "1. CAMERA LOCK: Maintain the EXACT SAME camera angle, zoom, and perspective as the original image. Do NOT shift, crop, or rotate the view.\n"
+    "2. GEOMETRY FREEZE: The structural lines (corners, windows, ceiling, floor) MUST remain pixel-perfectly aligned with the original.\n"
+    "3. IN-PAINTING ONLY: Only remove furniture and fill in the background. Do NOT redesign the room architecture.\n\n"
+
+    "<CRITICAL: DIMENSION & SCALE RULES>\n"
+    "1. READ TEXT: You MUST read the names written on the moodboard (e.g., sofa, bed, light, chair).\n"
+    "2. REALISTIC SCALING: Place the furniture in the room with accurate scale relative to the room's ceiling height (assume 2400mm ceiling).\n"
+    "3. NO DISTORTION: Do not stretch or squash the furniture to fit the space. Keep the original proportions.\n\n"
+
+    "<CRITICAL: DO NOT COPY PASTE>\n"
+    "1. RE-ARRANGE: Do NOT copy the layout or composition of the moodboard. Place furniture into the room's 3D space anew.\n"
+    "2. NO TEXT LABELS: IGNORE all text in the moodboard for rendering. Do NOT write any text in the final image.\n"
+    "3. REMOVE BACKGROUND: Do NOT paste the white background of the moodboard. Only extract the furniture items.\n\n"
+
+    "<LIGHTING INSTRUCTION: TURN ON ALL LIGHTS>\n"
+    "1. ACTIVATE LIGHTING: Identify items labeled as 'pendant/floor/table/wall lighting'.\n"
+    "2. STATE: All lighting fixtures MUST be TURNED ON.\n"
+    "3. COLOR TEMPERATURE: Use 4000K White light.\n"
+    "4. EMISSIVE MATERIAL: The light bulbs/shades must look bright and glowing (Emissive).\n"
+    "5. AMBIENT GLOW: Ensure the lights cast a soft glow on the surrounding walls and floor.\n\n"
+
+    "<MANDATORY WINDOW TREATMENT>\n"
+    "- Install pure WHITE CHIFFON CURTAINS on all windows.\n"
+    "- They must be SHEER (90% transparency), allowing natural light.\n\n"
+
+    "<DESIGN INSTRUCTIONS>\n"
+    "1. PERSPECTIVE MATCH: Align the furniture with the floor grid and vanishing points of the empty room.\n"
+    "2. PLACEMENT: Realistic placement.\n"
+    "OUTPUT RULE: Return ONLY the generated interior image. No text, no moodboard layout."
+)
+
+def moodboard_blob(moodboard_path):
+    if not moodboard_path:
+        return None
+    try:
+        return load_moodboard(moodboard_path)
+    except Exception:
+        return None
+
+def furnish_cache_key(empty_bytes, route, variant):
+    # 같은 빈 방 + 무드보드 + 프롬프트(스타일 포함) + 모델 + 변형 번호면 같은 결과를 재사용
+    ref_img = moodboard_blob(route.moodboard)
+    return make_key(empty_bytes, ref_img["data"] if ref_img else b"", route.prompt, MODEL_NAME,
+                    str(variant), RENDER_CACHE_VERSION)
+
+@timed("gemini_furnish")
+def generate_furnished(empty_bytes, route, variant=None):
     print(f"   🎨 [2단계] 가구 배치 중...", end="", flush=True)
     try:
-        room_img = Image.open(empty_path)
-        prompt = (
-           "IMAGE GENERATION TASK (Virtual Staging):\n"
-            "Furnish the empty room using the furniture styles shown in the Moodboard.\n\n"
-
-            "<CRITICAL: STRUCTURAL PRESERVATION>\n"
-            "1. CAMERA LOCK: Maintain the EXACT SAME camera angle, zoom, and perspective as the original image. Do NOT shift, crop, or rotate the view.\n"
-            "2. GEOMETRY FREEZE: The structural lines (corners, windows, ceiling, floor) MUST remain pixel-perfectly aligned with the original.\n"
-            "3. IN-PAINTING ONLY: Only remove furniture and fill in the background. Do NOT redesign the room architecture.\n\n"
-
-            "<CRITICAL: DIMENSION & SCALE RULES>\n"
-            "1. READ TEXT: You MUST read the names written on the moodboard (e.g., sofa, bed, light, chair).\n"
-            "2. REALISTIC SCALING: Place the furniture in the room with accurate scale relative to the room's ceiling height (assume 2400mm ceiling).\n"
-            "3. NO DISTORTION: Do not stretch or squash the furniture to fit the space. Keep the original proportions.\n\n"
-
-            "<CRITICAL: DO NOT COPY PASTE>\n"
-            "1. RE-ARRANGE: Do NOT copy the layout or composition of the moodboard. Place furniture into the room's 3D space anew.\n"
-            "2. NO TEXT LABELS: IGNORE all text in the moodboard for rendering. Do NOT write any text in the final image.\n"
-            "3. REMOVE BACKGROUND: Do NOT paste the white background of the moodboard. Only extract the furniture items.\n\n"
-
-            "<LIGHTING INSTRUCTION: TURN ON ALL LIGHTS>\n"
-            "1. ACTIVATE LIGHTING: Identify items labeled as 'pendant/floor/table/wall lighting'.\n"
-            "2. STATE: All lighting fixtures MUST be TURNED ON.\n"
-            "3. COLOR TEMPERATURE: Use 4000K White light.\n"
-            "4. EMISSIVE MATERIAL: The light bulbs/shades must look bright and glowing (Emissive).\n"
-            "5. AMBIENT GLOW: Ensure the lights cast a soft glow on the surrounding walls and floor.\n\n"
-
-            "<MANDATORY WINDOW TREATMENT>\n"
-            "- Install pure WHITE CHIFFON CURTAINS on all windows.\n"
-            "- They must be SHEER (90% transparency), allowing natural light.\n\n"
-
-            "<DESIGN INSTRUCTIONS>\n"
-            "1. PERSPECTIVE MATCH: Align the furniture with the floor grid and vanishing points of the empty room.\n"
-            "2. PLACEMENT: Realistic placement.\n"
-            "OUTPUT RULE: Return ONLY the generated interior image. No text, no moodboard layout."
-        )        
-        input_content = [prompt, "Background Empty Room:", room_img]
-        if moodboard_path:
-            try:
-                ref_img = Image.open(moodboard_path)
-                ref_img.thumbnail((2048, 2048))
-                input_content.append("Furniture Reference:")
-                input_content.append(ref_img)
-            except: pass
-            
-        model = genai.GenerativeModel(MODEL_NAME)
-        response = model.generate_content(input_content)
+        # 하위 단계(업스케일/업로드) 실패 후 재시도하면 Gemini를 다시 부르지 않음
+        cache_key = furnish_cache_key(empty_bytes, route, variant) if variant is not None else None
+        if cache_key:
+            cached = RENDER_CACHE.get(cache_key)
+            if cached is not None:
+                print(" 완료 (캐시)!")
+                return cached
         
-        if response.parts:
-            for part in response.parts:
-                if hasattr(part, 'inline_data') and part.inline_data:
-                    unique = uuid.uuid4().hex[:6]
-                    output_path = os.path.join(WORK_DIR, f"temp_furnished_{unique}.jpg")
-                    with open(output_path, 'wb') as f: f.write(part.inline_data.data)
-                    print(" 완료!")
-                    return standardize_image(output_path)
-    except Exception as e: print(f" 실패 ({e})")
+        input_content = [route.prompt, "Background Empty Room:", jpeg_blob(empty_bytes)]
+        ref_img = moodboard_blob(route.moodboard)
+        if ref_img:
+            input_content.append("Furniture Reference:")
+            input_content.append(ref_img)
+            
+        data = generate_image(input_content, "furnish")
+        print(" 완료!")
+        furnished = standardize_image(data)
+        if cache_key:
+            RENDER_CACHE.put(cache_key, furnished)
+        return furnished
+    except Exception as e:
+        API_FAILURES.inc(provider="gemini", reason=type(e).__name__)
+        print(f" 실패 ({e})")
     return None
 
-def upscale_image(image_path):
+# 매그니픽 클라이언트는 프로세스 전체에서 1개 (커넥션 풀 + 이벤트 루프 공유)
+_upscaler = None
+_upscaler_lock = threading.Lock()
+
+def get_upscaler():
+    global _upscaler
+    with _upscaler_lock:
+        if _upscaler is None:
+            from magnific_client import BackgroundUpscaler, MagnificClient, WebhookReceiver
+            webhook = None
+            if CONFIG.magnific_webhook_url:
+                webhook = WebhookReceiver(port=CONFIG.magnific_webhook_port, public_url=CONFIG.magnific_webhook_url,
+                                          secret=CONFIG.magnific_webhook_secret)
+            client = MagnificClient(CONFIG.magnific_api_key, endpoint=CONFIG.magnific_endpoint, webhook=webhook)
+            _upscaler = BackgroundUpscaler(client)
+    return _upscaler
+
+@timed("magnific_upscale")
+def upscale_image(image_bytes):
     print("   ✨ [3단계] 고화질 변환 중...", end="", flush=True)
-    if not MAGNIFIC_API_KEY: 
+    if not CONFIG.magnific_api_key and _upscaler is None: 
         print(" (⚠️ API키가 설정되지 않았습니다!)")
-        return image_path
+        return image_bytes
+    from magnific_client import MagnificError
         
     try:
-        with open(image_path, "rb") as f:
-            b64 = base64.b64encode(f.read()).decode('utf-8')
-            
-        payload = {
-            "image": b64, 
-            "scale_factor": "2x", 
-            "optimized_for": "standard",
-            "prompt": "realistic interior, highly detailed, photorealistic",
-            "creativity": 1, 
-            "hdr": 2, 
-            "resemblance": 4, 
-            "fractality": 2, 
-            "engine": "automatic"
-        }
-        headers = {
-            "x-freepik-api-key": MAGNIFIC_API_KEY, 
-            "Content-Type": "application/json", 
-            "Accept": "application/json"
-        }
-        
-        res = requests.post(MAGNIFIC_ENDPOINT, json=payload, headers=headers)
-        
-        if res.status_code == 200:
-            data = res.json()
-            
-            # [디버깅] 응답 데이터 확인용
-            if "data" not in data:
-                print(f" ⚠️ [API 응답 이상] {data}")
-                return image_path
-
-            # 1. 바로 생성된 경우
-            if "generated" in data["data"] and len(data["data"]["generated"]) > 0:
-                url = data["data"]["generated"][0]
-                print(" 완료 (즉시생성)!")
-                return download_from_url(url, image_path)
-                
-            # 2. 대기열(Task)에 들어간 경우
-            elif "task_id" in data["data"]:
-                task_id = data["data"]["task_id"]
-                print(f" (대기열 {task_id})...", end="", flush=True)
-                
-                for _ in range(60): # 2분 대기
-                    time.sleep(2)
-                    check = requests.get(f"{MAGNIFIC_ENDPOINT}/{task_id}", headers=headers)
-                    if check.status_code == 200:
-                        s_data = check.json()
-                        status = s_data.get("data", {}).get("status")
-                        
-                        if status == "COMPLETED":
-                            if "generated" in s_data["data"] and len(s_data["data"]["generated"]) > 0:
-                                url = s_data["data"]["generated"][0]
-                                print(" 완료!")
-                                return download_from_url(url, image_path)
-                            else:
-                                print(f" ⚠️ 완료됐는데 이미지가 없음: {s_data}")
-                                return image_path
-                                
-                        elif status == "FAILED":
-                            print(f" ❌ 매그니픽 작업 실패: {s_data.get('data', {}).get('message')}")
-                            break
-            else:
-                print(f" ⚠️ 이미지 생성 실패 (데이터 없음): {data}")
-                
-        elif res.status_code == 401:
-            print(" ❌ [인증 실패] API 키가 틀렸거나 만료되었습니다.")
-        elif res.status_code == 402:
-            print(" ❌ [결제 필요] 매그니픽 크레딧이 부족합니다.")
-        else:
-            print(f" ❌ API 에러 ({res.status_code}): {res.text}")
-
+        upscaler = get_upscaler()
+        cache_key = make_key(image_bytes, json.dumps(upscaler.client.payload, sort_keys=True))
+        cached = UPSCALE_CACHE.get(cache_key)
+        if cached is not None:
+            print(" 완료 (캐시)!")
+            return cached
+        # 메모리 예산은 업로드까지 포함해 deliver_variant에서 예약
+        # 속도 제한/재시도는 과금되는 제출에만 -> 대기/다운로드 오류로 같은 이미지를 다시 제출하지 않음
+        task = MAGNIFIC.call(upscaler.submit, image_bytes)
+        upscaled = upscaler.finish(task)
+        UPSCALE_CACHE.put(cache_key, upscaled)
+        print(" 완료!")
+        return upscaled
+    except MagnificError as e:
+        API_FAILURES.inc(provider="magnific", reason=str(e.status or "error"))
+        print(f" ❌ {e}")
     except Exception as e: 
+        API_FAILURES.inc(provider="magnific", reason=type(e).__name__)
         print(f" 시스템 에러 ({e})")
         
     print(" -> (원본 화질로 저장)")
-    return image_path
+    return image_bytes
+
+# ---------------------------------------------------------
+# [외부 클라이언트 교체] 벤치마크/로컬 실행에서 가짜 드라이브/Gemini/매그니픽 주입
+# ---------------------------------------------------------
+_genai_lock = threading.Lock()
+_genai_ready = False
+
+def _genai_model(name):
+    # google.generativeai는 import만 1초 가까이 걸려서 처음 모델을 만들 때 불러옴
+    global _genai_ready
+    import google.generativeai as genai
+    with _genai_lock:
+        if not _genai_ready and CONFIG.nanobanana_api_key:
+            genai.configure(api_key=CONFIG.nanobanana_api_key)
+        _genai_ready = True
+    return genai.GenerativeModel(name)
+
+_model_factory = _genai_model
+_models = {}
+_models_lock = threading.Lock()
+
+def get_model(name=MODEL_NAME):
+    # 모델 객체는 한 번만 만들고 모든 스레드가 재사용
+    with _models_lock:
+        if name not in _models:
+            _models[name] = _model_factory(name)
+        return _models[name]
+
+def set_backends(drive=None, model_factory=None, upscaler=None):
+    global _drive_service, _model_factory, _upscaler
+    if drive is not None:
+        _drive_service = drive
+    if model_factory is not None:
+        _model_factory = model_factory
+        _models.clear()
+    if upscaler is not None:
+        _upscaler = upscaler
+
+# ---------------------------------------------------------
+# [기능 4] 변형 병렬 처리 (가구 배치 -> 업스케일 -> 업로드)
+# ---------------------------------------------------------
+def ledger_stage(file_id, stage, produce):
+    # 이미 끝난 단계면 저장된 결과를 그대로 사용 (재시작 시 Gemini/Magnific 재호출 방지)
+    data = LEDGER.load_artifact(file_id, stage)
+    if data is not None:
+        print(f"   ⏩ [{stage}] 이전 결과 사용")
+        return data
+    data = produce()
+    if data:
+        LEDGER.complete_stage(file_id, stage, data)
+    return data
+
+def variant_name(info, i):
+    return f"{info['customer']}_{info['room']}_{info['style']}_{info['variant']}_render({i}).jpg"
+
+def is_variant_done(file_id, i, existing):
+    return i in existing or LEDGER.is_stage_done(file_id, f"upload_{i}")
+
+def deliver_variant(file_id, furnished, info, i, job_key=None, lease=None):
+    # 업스케일 -> 업로드 (생성된 이미지 1장)
+    output_name = variant_name(info, i)
+    # 업스케일 결과는 업로드가 끝날 때까지 메모리에 있으므로 예약도 그때까지 유지
+    with MEMORY_BUDGET.reserve(len(furnished) * UPSCALE_MEMORY_FACTOR):
+        final = LEDGER.load_artifact(file_id, f"upscaled_{i}")
+        if final is None:
+            final = upscale_image(furnished)
+            # 업스케일 실패로 원본이 그대로 돌아온 경우는 기록하지 않음 (다음에 다시 시도)
+            if final is not furnished:
+                LEDGER.complete_stage(file_id, f"upscaled_{i}", final)
+        
+        if lease:
+            lease.check()  # 다른 인스턴스가 가져갔으면 중복 업로드하지 않음
+        app_properties = {"job_key": job_key, "variant": str(i)} if job_key else None
+        uploaded_id = upload_file(get_drive_service(), final, ID_DRAFT, output_name, app_properties)
+    LEDGER.complete_stage(file_id, f"upload_{i}", meta={"name": output_name, "drive_id": uploaded_id})
+    return True
+
+def render_variant(file_id, empty_bytes, route, info, i, job_key=None, existing=(), lease=None):
+    if is_variant_done(file_id, i, existing):
+        print(f"\n   ⏩ [변형 {i}/{VARIANT_COUNT}] 이미 업로드됨: {variant_name(info, i)}")
+        return True
+    
+    print(f"\n   🔄 [변형 {i}/{VARIANT_COUNT}] 생성 시작...")
+    furnished = ledger_stage(file_id, f"furnished_{i}", lambda: generate_furnished(empty_bytes, route, i))
+    if not furnished:
+        print(f"   ❌ [변형 {i}] 생성 실패 (Skip)")
+        return False
+    return deliver_variant(file_id, furnished, info, i, job_key, lease)
+
+def render_variants(file_id, empty_bytes, route, info, job_key=None, existing=(), lease=None):
+    if SPECULATIVE_VARIANTS > VARIANT_COUNT:
+        return render_variants_speculative(file_id, empty_bytes, route, info, job_key, existing, lease)
+    workers = max(1, min(VARIANT_WORKERS, VARIANT_COUNT))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="variant") as pool:
+        futures = [
+            pool.submit(render_variant, file_id, empty_bytes, route, info, i, job_key, existing, lease)
+            for i in range(1, VARIANT_COUNT + 1)
+        ]
+        done_count = 0
+        for i, future in enumerate(futures, start=1):
+            try:
+                if future.result():
+                    done_count += 1
+            except Exception as e:
+                print(f"   ❌ [변형 {i}] 에러: {e}")
+    return done_count
+
+def furnish_candidate(empty_bytes, route, stop):
+    # 이미 필요한 장수를 채웠으면 호출하지 않음 (대기 중이던 후보)
+    if stop.is_set():
+        return None
+    return generate_furnished(empty_bytes, route)
+
+def render_variants_speculative(file_id, empty_bytes, route, info, job_key=None, existing=(), lease=None):
+    # 후보를 한꺼번에 요청 -> 먼저 도착한 정상 결과부터 빈 변형 번호에 배정 -> 나머지는 버림
+    slots = [i for i in range(1, VARIANT_COUNT + 1) if not is_variant_done(file_id, i, existing)]
+    done_count = VARIANT_COUNT - len(slots)
+    quality = None
+    if QUALITY_FILTER:
+        quality = QualityFilter(empty_room=empty_bytes, moodboard=load_moodboard(route.moodboard)["data"],
+                                min_distance=QUALITY_MIN_DISTANCE)
     
-def download_from_url(url, save_path):
-    res = requests.get(url)
-    if res.status_code == 200:
-        with open(save_path, "wb") as f: f.write(res.content)
-    return save_path
+    # 이전 실행에서 생성까지 끝난 변형은 장부/렌더 캐시에서 복구
+    ready = []
+    for i in list(slots):
+        furnished = LEDGER.load_artifact(file_id, f"furnished_{i}")
+        if furnished is None:
+            furnished = RENDER_CACHE.get(furnish_cache_key(empty_bytes, route, i))
+        if furnished:
+            ready.append((i, furnished))
+            slots.remove(i)
+            if quality:
+                quality.accept(furnished)
+    
+    attempts = len(slots) + (SPECULATIVE_VARIANTS - VARIANT_COUNT) if slots else 0
+    # 실패/탈락한 후보는 새 후보로 대신하되, 전체 후보 수는 상한까지만 (넘으면 누락 -> render_job에서 실패 처리)
+    max_candidates = max(attempts, SPECULATIVE_MAX_CANDIDATES) if slots else 0
+    if attempts:
+        print(f"\n   🎲 후보 {attempts}장 동시 생성 -> 먼저 도착한 {len(slots)}장 사용 (최대 {max_candidates}장)")
+    stop = threading.Event()
+    deliver_pool = ThreadPoolExecutor(max_workers=max(1, min(VARIANT_WORKERS, VARIANT_COUNT)),
+                                      thread_name_prefix="variant")
+    candidate_pool = ThreadPoolExecutor(max_workers=max(1, attempts), thread_name_prefix="candidate")
+    try:
+        deliveries = {deliver_pool.submit(deliver_variant, file_id, data, info, i, job_key, lease): i
+                      for i, data in ready}
+        candidates = [candidate_pool.submit(furnish_candidate, empty_bytes, route, stop)
+                      for _ in range(attempts)]
+        pending = set(candidates)
+        while slots and pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                if not slots:
+                    break
+                try:
+                    furnished = future.result()
+                except Exception as e:
+                    print(f"   ❌ [후보] 에러: {e}")
+                    furnished = None
+                reason = quality.check(furnished) if furnished and quality else None
+                if not furnished:
+                    VARIANT_CANDIDATES.inc(result="failed")
+                elif reason:
+                    VARIANT_CANDIDATES.inc(result=f"rejected_{reason}")
+                    print(f"   🚫 [후보] 품질 검사 탈락 ({reason})")
+                if not furnished or reason:
+                    if len(candidates) < max_candidates:
+                        candidates.append(candidate_pool.submit(furnish_candidate, empty_bytes, route, stop))
+                        pending.add(candidates[-1])
+                    continue
+                VARIANT_CANDIDATES.inc(result="accepted")
+                i = slots.pop(0)
+                LEDGER.complete_stage(file_id, f"furnished_{i}", furnished)
+                RENDER_CACHE.put(furnish_cache_key(empty_bytes, route, i), furnished)
+                deliveries[deliver_pool.submit(deliver_variant, file_id, furnished, info, i, job_key, lease)] = i
+        
+        # 남은 후보: 시작 전이면 취소, 이미 요청 중이면 결과를 기다리지 않고 버림
+        stop.set()
+        for future in candidates:
+            if future.cancel() or not future.done():
+                VARIANT_CANDIDATES.inc(result="cancelled")
+        
+        for future in as_completed(deliveries):
+            try:
+                if future.result():
+                    done_count += 1
+            except Exception as e:
+                print(f"   ❌ [변형 {deliveries[future]}] 에러: {e}")
+    finally:
+        candidate_pool.shutdown(wait=False, cancel_futures=True)
+        deliver_pool.shutdown(wait=True)
+    if slots:
+        print(f"   ⚠️ 후보 {len(candidates)}장(상한)에서도 정상 결과가 부족해 {len(slots)}장 누락")
+    return done_count
 
 # ---------------------------------------------------------
 # [메인] 봇 실행 루프
 # ---------------------------------------------------------
-def main():
-    print("🤖 AI 인테리어 봇 가동 (공유 드라이브 모드)")
-    print("   Target: 1 input -> 3 variations")
-    
+def process_job(job):
+    # 다른 인스턴스가 이미 잡은 파일은 건너뜀 (lease가 만료되면 다음 전체 조회 때 다시 시도)
+    lease = LEASES.claim(job.file_id)
+    if lease is None:
+        print(f"\n⏭️ 다른 인스턴스가 처리 중: {job.name}")
+        return
+    try:
+        render_job(job, lease)
+    except Exception:
+        lease.release()
+        raise
+
+def job_memory_estimate(file):
+    # 원본 다운로드 + 규격화한 입력 + 빈 방 + 변형마다 생성 결과 1장
+    raw = int(file.get('size') or DEFAULT_DOWNLOAD_ESTIMATE)
+    return raw + (2 + VARIANT_COUNT) * GEMINI_RESPONSE_ESTIMATE
+
+def render_job(job, lease):
     service = get_drive_service()
+    file_id = job.file_id
+    file_name = job.name
+    print(f"\n📄 처리 시작: {file_name}")
     
-    while True:
-        try:
-            # 1. IN-BOX 확인
-            files = list_new_files(service, ID_INBOX)
+    # 정보 파싱
+    info = parse_filename(file_name)
+    print(f"   ℹ️ 정보: {info['customer']} | {info['room']} | {info['style']} | {info['variant']}")
+    
+    # 무드보드/프롬프트 (보통 감시 단계에서 이미 걸러짐 - 그 사이 카탈로그를 다시 읽은 경우 대비)
+    try:
+        route = route_job(info)
+    except UnknownStyle as e:
+        reject_file(job.file, e)
+        lease.release()
+        return
+    
+    job_key = make_job_key(job.file, info)
+    with job_key_lock(job_key):
+        # 생성 전에 이미 올라간 결과물 확인 (중복 업로드된 사진 / 업로드 후 중단된 작업)
+        existing = find_existing_outputs(service, job_key)
+        if len(existing) >= VARIANT_COUNT:
+            print(f"   ⏩ 이미 렌더된 사진입니다 (결과물 {len(existing)}장) -> 생성 생략")
+            archive_job(job, lease)
+            return
+        
+        LEDGER.begin(file_id, file_name)
+        # 입력/빈 방/변형 바이트는 작업이 끝날 때까지 살아 있으므로 작업 단위로 한 번 예약
+        with MEMORY_BUDGET.reserve(job_memory_estimate(job.file), base=True):
+            try:
+                # 다운로드 (메모리로 바로 받음)
+                with job.stage("download"):
+                    image_bytes = ledger_stage(file_id, "input", lambda: standardize_image(download_file(service, file_id)))
+            
+                # 빈 방 생성 (1회)
+                with job.stage("empty_room"):
+                    empty_bytes = ledger_stage(file_id, "empty_room", lambda: generate_empty_room(image_bytes))
+                if not empty_bytes:
+                    raise RuntimeError("빈 방 생성 실패")
+                cache_stats = EMPTY_ROOM_CACHE.stats()
+                print(f"   💾 빈 방 캐시: 적중 {cache_stats['hits']} / 미적중 {cache_stats['misses']}")
+                lease.check()
             
-            # [디버깅 로그] (봇이 살아있는지 확인용)
-            print(f"[감시 중] 발견된 파일: {len(files)}개")
+                # 3장 생성 (병렬) - 이미 있는 변형은 건너뜀
+                with job.stage("variants"):
+                    done_count = render_variants(file_id, empty_bytes, route, info, job_key, existing, lease)
+                print(f"\n   📦 변형 {done_count}/{VARIANT_COUNT}장 업로드 완료")
+                lease.check()
+                if done_count < VARIANT_COUNT:
+                    # 일부만 나왔으면 보관함으로 옮기지 않고 실패 처리 -> 끝난 변형은 장부/DRAFT에 남아 다음 시도에서 건너뜀
+                    raise RuntimeError(f"변형 {VARIANT_COUNT - done_count}장 누락 ({done_count}/{VARIANT_COUNT})")
+            except LeaseLost:
+                # 다른 인스턴스가 이어받았으므로 실패 횟수에 넣지 않음
+                print(f"   ⚠️ lease 만료 -> 다른 인스턴스에 넘김: {file_name}")
+                raise
+            except Exception as e:
+                row = LEDGER.mark_failed(file_id, e)
+                if row["status"] == "dead":
+                    print(f"   ☠️ {row['attempts']}회 실패 -> 격리 (더 이상 자동 재시도 안 함): {file_name}")
+                raise
+    
+    # 변형이 모두 올라간 뒤에만 이동 (배치로 모아서 처리, 이동이 끝나면 장부 정리)
+    archive_job(job, lease)
 
-            if not files:
-                time.sleep(10)
+def poll_inbox(watcher):
+    # 격리(dead)된 파일과 카탈로그에 없는 조합은 대기열에 넣지 않음 (다운로드/lease 전에 거절)
+    files = []
+    for f in watcher.poll():
+        row = LEDGER.get(f['id'])
+        if row and row['status'] == 'dead':
+            if row['name'] == f['name']:
                 continue
-            
-            for file in files:
-                file_id = file['id']
-                file_name = file['name']
-                print(f"\n📄 처리 시작: {file_name}")
-                
-                # 정보 파싱
-                info = parse_filename(file_name)
-                print(f"   ℹ️ 정보: {info['customer']} | {info['room']} | {info['style']} | {info['variant']}")
-                
-                # 무드보드 찾기
-                ref_path = find_moodboard(info['room'], info['style'], info['variant'])
-                if not ref_path:
-                    print(f"   ⚠️ 무드보드를 찾을 수 없습니다. (assets 확인 필요)")
-                    move_file_to_archive(service, file_id, ID_INBOX, ID_ARCHIVE)
-                    continue
-                
-                # 다운로드
-                local_path = os.path.join(WORK_DIR, file_name)
-                download_file(service, file_id, local_path)
-                std_path = standardize_image(local_path)
-                
-                # 빈 방 생성 (1회)
-                empty_path = generate_empty_room(std_path)
-                if not empty_path:
-                    print("   ❌ 빈 방 생성 실패")
-                    continue
-                
-                # 3장 생성 루프
-                for i in range(1, 4):
-                    print(f"\n   🔄 [변형 {i}/3] 생성 시작...")
-                    furnished_path = generate_furnished(empty_path, ref_path)
-                    
-                    if furnished_path:
-                        final_path = upscale_image(furnished_path)
-                        output_name = f"{info['customer']}_{info['room']}_{info['style']}_{info['variant']}_render({i}).jpg"
-                        upload_file(service, final_path, ID_DRAFT, output_name)
-                    else:
-                        print("   ❌ 생성 실패 (Skip)")
-                
-                # 작업 완료 후 이동
-                move_file_to_archive(service, file_id, ID_INBOX, ID_ARCHIVE)
-                print(f"✅ 원본 파일 이동 완료.\n")
-                
-                shutil.rmtree(WORK_DIR)
-                os.makedirs(WORK_DIR, exist_ok=True)
-                
+            # 격리된 뒤 이름이 바뀐 파일 (파일명을 고친 경우) -> 다시 시도
+            LEDGER.retry(f['id'])
+        try:
+            route_job(parse_filename(f['name']))
+        except UnknownStyle as e:
+            reject_file(f, e)
+            continue
+        files.append(f)
+    return files
+
+def build_watcher(service):
+    return InboxWatcher(
+        service, ID_INBOX, drive_id=INBOX_DRIVE_ID,
+        min_interval=POLL_INTERVAL, max_interval=POLL_INTERVAL_MAX,
+    )
+
+def build_scheduler(service, watcher=None):
+    watcher = watcher or build_watcher(service)
+    return JobScheduler(
+        list_files=lambda: poll_inbox(watcher),
+        handle_job=process_job,
+        workers=JOB_WORKERS,
+        poll_interval=POLL_INTERVAL,
+        next_interval=watcher.next_interval,
+    )
+
+def register_gauges(scheduler):
+    REGISTRY.gauge("bot_queue_depth", "Jobs waiting in the queue", lambda: scheduler.status()["queued"])
+    REGISTRY.gauge("bot_jobs_in_flight", "Jobs being processed", lambda: scheduler.status()["in_flight"])
+    REGISTRY.gauge("bot_job_workers", "Job worker threads", lambda: scheduler.workers)
+    REGISTRY.gauge("bot_batch_pending", "Drive batch requests waiting", lambda: get_drive_batcher().pending())
+    REGISTRY.gauge("bot_empty_room_cache_hits", "Empty-room cache hits", lambda: EMPTY_ROOM_CACHE.hits)
+    REGISTRY.gauge("bot_empty_room_cache_misses", "Empty-room cache misses", lambda: EMPTY_ROOM_CACHE.misses)
+    REGISTRY.gauge("bot_render_cache_hits", "Furnished render cache hits", lambda: RENDER_CACHE.hits)
+    REGISTRY.gauge("bot_render_cache_misses", "Furnished render cache misses", lambda: RENDER_CACHE.misses)
+    REGISTRY.gauge("bot_upscale_cache_hits", "Upscale cache hits", lambda: UPSCALE_CACHE.hits)
+    REGISTRY.gauge("bot_upscale_cache_misses", "Upscale cache misses", lambda: UPSCALE_CACHE.misses)
+    REGISTRY.gauge("bot_leases_held", "Inbox files leased by this instance", lambda: len(LEASES.held()))
+    MEMORY_BUDGET.register_gauges()
+
+def set_variant_workers(workers):
+    # 다음 작업부터 적용 (진행 중인 작업의 변형 스레드 수는 그대로)
+    global VARIANT_WORKERS
+    VARIANT_WORKERS = workers
+
+def build_control(scheduler, watcher):
+    # 재시작 없이 바꿀 수 있는 설정: 이름 -> (읽기, 쓰기, 형 변환)
+    settings = {
+        "job_workers": (lambda: scheduler.workers, scheduler.set_workers, int),
+        "variant_workers": (lambda: VARIANT_WORKERS, set_variant_workers, int),
+        "poll_min": (lambda: watcher.min_interval, lambda v: watcher.set_intervals(min_interval=v), float),
+        "poll_max": (lambda: watcher.max_interval, lambda v: watcher.set_intervals(max_interval=v), float),
+    }
+    for provider in (GEMINI, MAGNIFIC):
+        settings[f"{provider.name}_rpm"] = (
+            lambda p=provider: p.settings()["rpm"], lambda v, p=provider: p.configure(rpm=v), float)
+        settings[f"{provider.name}_concurrency"] = (
+            lambda p=provider: p.limiter.max_limit, lambda v, p=provider: p.configure(concurrency=v), int)
+    
+    def status_extra():
+        return {
+            "providers": {p.name: p.settings() for p in (GEMINI, MAGNIFIC)},
+            "poll_interval": round(watcher.next_interval(), 1),
+            "memory_budget": {"max": MEMORY_BUDGET.max_bytes, "in_use": MEMORY_BUDGET.in_use,
+                              "peak": MEMORY_BUDGET.peak, "waiting": MEMORY_BUDGET.waiting},
+            "leases_held": len(LEASES.held()),
+        }
+    
+    def diagnose():
+        from check_drive import config_folders, diagnose_all
+        return diagnose_all(get_drive_service(), config_folders(CONFIG))
+    
+    return ControlPlane(scheduler, settings, ledger=LEDGER, diagnose=diagnose, catalog=CATALOG,
+                        status_extra=status_extra, token=CONFIG.admin_token).register()
+
+def profile_startup():
+    # 시작 단계별 소요 시간만 재고 종료 (감시 루프는 돌리지 않음)
+    phases = [("import bot + 설정", _IMPORT_SECONDS)]
+    def measure(label, fn):
+        start = time.perf_counter()
+        note = ""
+        try:
+            fn()
         except Exception as e:
-            print(f"\n❌ 봇 에러: {e}")
-            time.sleep(60)
+            note = f" (실패: {e})"
+        phases.append((label + note, time.perf_counter() - start))
+    
+    measure("작업 장부 (SQLite)", LEDGER.instance)
+    measure("lease 저장소", LEASES.instance)
+    measure("스타일 카탈로그", CATALOG.instance)
+    measure("빈 방 캐시 색인", EMPTY_ROOM_CACHE.instance)
+    measure("렌더/업스케일 캐시 색인", lambda: (RENDER_CACHE.instance(), UPSCALE_CACHE.instance()))
+    measure("드라이브 service (static discovery)", get_drive_service)
+    measure("google.generativeai import + 모델", get_model)
+    measure("aiohttp + 매그니픽 클라이언트 import", lambda: __import__("magnific_client"))
+    
+    print("⏱️ 시작 프로파일")
+    for label, seconds in phases:
+        print(f"   {seconds * 1000:8.1f}ms  {label}")
+    print(f"   {sum(s for _, s in phases) * 1000:8.1f}ms  합계 (첫 감시까지는 이 중 import + 장부 + 드라이브만 필요)")
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="AI 인테리어 봇")
+    parser.add_argument("--profile-startup", action="store_true", help="시작 단계별 import/초기화 시간만 출력하고 종료")
+    args = parser.parse_args()
+    if args.profile_startup:
+        profile_startup()
+        return
+    
+    if not CONFIG.service_account_file:
+        print("🚨 [비상] service_account.json 파일을 찾을 수 없습니다!")
+        print("   -> Render 설정의 'Secret Files'에 파일을 등록했는지 확인하세요.")
+    os.makedirs(ASSETS_DIR, exist_ok=True)
+    
+    print("🤖 AI 인테리어 봇 가동 (공유 드라이브 모드)")
+    print(f"   Target: 1 input -> {VARIANT_COUNT} variations (동시 {VARIANT_WORKERS}개)")
+    print(f"   Scheduler: 워커 {JOB_WORKERS}개, {POLL_INTERVAL}~{POLL_INTERVAL_MAX}초 간격 감시 (변경분 조회)")
+    print(f"   Lease: {LEASES.backend.name} (인스턴스 {LEASES.owner}, {LEASES.ttl}초)")
+    catalog = CATALOG.summary()
+    print(f"   Catalog: 공간/스타일/번호 조합 {catalog['routes']}개 ({ASSETS_DIR})")
+    for problem in catalog["problems"]:
+        print(f"   ⚠️ {problem}")
+    
+    service = get_drive_service()
+    watcher = build_watcher(service)
+    scheduler = build_scheduler(service, watcher)
+    register_gauges(scheduler)
+    build_control(scheduler, watcher)
+    start_metrics_server(CONFIG.metrics_port)
+    print(f"   Metrics: http://0.0.0.0:{CONFIG.metrics_port}/metrics")
+    start_admin_server(CONFIG.admin_port, CONFIG.admin_host)
+    auth = "토큰 필요" if CONFIG.admin_token else "토큰 없음"
+    print(f"   Admin: http://{CONFIG.admin_host}:{CONFIG.admin_port}/admin/status ({auth}, python admin.py status)")
+    scheduler.run_forever()
+
+_IMPORT_SECONDS = time.perf_counter() - _IMPORT_STARTED
 
 if __name__ == "__main__":
     main()
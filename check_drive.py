@@ -1,68 +1,136 @@
-import os
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-# -----------------------------------------------------
-# [진단 대상] 확인하고 싶은 폴더 ID (01_INBOX)
-TARGET_FOLDER_ID = '1cYHh2k40_vyasnu__LbesA4WwAJOsSFo'
-# -----------------------------------------------------
+# ---------------------------------------------------------
+# [드라이브 진단] INBOX / DRAFT / ARCHIVE 폴더 접속 + 권한 + 파일 수를 병렬로 확인
+#  - 폴더 ID / 서비스 계정 경로는 config(환경 변수, .env)에서 읽음
+#  - python check_drive.py           -> 세 폴더 모두
+#  - python check_drive.py inbox     -> 지정한 폴더만
+#  - 봇이 실행 중이면 admin.py drive (/admin/drive)로도 같은 결과
+# ---------------------------------------------------------
+FOLDER_FIELDS = "id, name, driveId, capabilities(canListChildren, canAddChildren, canRemoveChildren)"
 
-SERVICE_ACCOUNT_FILE = 'service_account.json'
+# 봇이 폴더마다 필요한 권한 (INBOX: 목록 + 보관함으로 옮기기, DRAFT/ARCHIVE: 파일 추가)
+REQUIRED_CAPABILITIES = {
+    "inbox": ("canListChildren", "canRemoveChildren"),
+    "draft": ("canAddChildren",),
+    "archive": ("canAddChildren",),
+}
+
+
+def config_folders(config):
+    return {"inbox": config.id_inbox, "draft": config.id_draft, "archive": config.id_archive}
+
+
+def diagnose_folder(service, label, folder_id, sample=5):
+    start = time.perf_counter()
+    report = {"folder_id": folder_id}
+    try:
+        # 공유 드라이브 폴더는 supportsAllDrives가 없으면 못 찾음
+        folder = service.files().get(fileId=folder_id, fields=FOLDER_FIELDS, supportsAllDrives=True).execute()
+    except Exception as e:
+        report.update(ok=False, error=f"폴더 접속 실패: {e}", ms=round((time.perf_counter() - start) * 1000))
+        return report
+    capabilities = folder.get("capabilities", {})
+    report.update(name=folder["name"], drive_id=folder.get("driveId"), capabilities=capabilities,
+                  missing=[c for c in REQUIRED_CAPABILITIES.get(label, ()) if not capabilities.get(c)])
+
+    query = f"'{folder_id}' in parents and trashed = false"
+    files, page_token = [], None
+    try:
+        while True:
+            results = service.files().list(
+                q=query,
+                fields="nextPageToken, files(id, name, mimeType, size)",
+                pageSize=1000,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True
+            ).execute()
+            files.extend(results.get("files", []))
+            page_token = results.get("nextPageToken")
+            if not page_token:
+                break
+    except Exception as e:
+        report.update(ok=False, error=f"파일 목록 조회 실패: {e}", ms=round((time.perf_counter() - start) * 1000))
+        return report
+
+    images = [f for f in files if f.get("mimeType", "").startswith("image/")]
+    report.update(
+        ok=not report["missing"],
+        files=len(files),
+        images=len(images),
+        bytes=sum(int(f.get("size") or 0) for f in files),
+        sample=[f["name"] for f in files[:sample]],
+        ms=round((time.perf_counter() - start) * 1000),
+    )
+    return report
 
-def run_diagnosis():
-    print("----- 🕵️‍♂️ 구글 드라이브 진단 (공유 드라이브 모드) -----")
 
-    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+def diagnose_all(service, folders, sample=5):
+    # service는 스레드 안전한 공용 service (drive_batch.build_shared_service)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, len(folders)), thread_name_prefix="diagnose") as pool:
+        futures = {label: pool.submit(diagnose_folder, service, label, folder_id, sample)
+                   for label, folder_id in folders.items()}
+        results = {label: future.result() for label, future in futures.items()}
+    return {"folders": results, "ms": round((time.perf_counter() - start) * 1000)}
+
+
+def print_report(report):
+    for label, result in report["folders"].items():
+        print(f"\n📁 {label.upper()} ({result['folder_id']})")
+        if "name" in result:
+            print(f"   ✅ [접속 성공] 폴더 이름: '{result['name']}'")
+        if "error" in result:
+            print(f"   ❌ {result['error']}")
+            continue
+        if result["missing"]:
+            print(f"   ❌ [권한 부족] {', '.join(result['missing'])}")
+        print(f"   📊 파일 {result['files']}개 (이미지 {result['images']}개, {result['bytes'] / 1024 / 1024:.1f}MB) - {result['ms']}ms")
+        for name in result["sample"]:
+            print(f"      - {name}")
+        if not result["files"]:
+            print("   ⚠️ 폴더가 비어 있습니다 (혹은 권한 문제).")
+    print(f"\n⏱️ 전체 {report['ms']}ms (폴더 병렬 조회)")
+
+
+def run_diagnosis(labels=()):
+    from google.oauth2 import service_account
+
+    from config import Config
+    from drive_batch import build_shared_service
+
+    print("----- 🕵️‍♂️ 구글 드라이브 진단 (공유 드라이브 모드) -----")
+    config = Config.from_env()
+    if not config.service_account_file:
         print("❌ [오류] service_account.json 파일이 없습니다.")
-        return
+        return None
+
+    folders = config_folders(config)
+    unknown = [label for label in labels if label not in folders]
+    if unknown:
+        print(f"❌ [오류] 알 수 없는 폴더: {', '.join(unknown)} (가능: {', '.join(folders)})")
+        return None
+    if labels:
+        folders = {label: folders[label] for label in labels}
 
     try:
         creds = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=['https://www.googleapis.com/auth/drive']
+            config.service_account_file, scopes=['https://www.googleapis.com/auth/drive']
         )
-        service = build('drive', 'v3', credentials=creds)
+        service = build_shared_service(creds)
         print(f"✅ [로그인] 봇 이메일: {creds.service_account_email}")
-
-        # ---------------------------------------------------------
-        # [수정된 부분] supportsAllDrives=True 옵션 추가
-        # ---------------------------------------------------------
-        print(f"🔍 폴더 ID ({TARGET_FOLDER_ID}) 접속 시도...")
-        
-        try:
-            # 폴더 정보 가져오기 (공유 드라이브 지원 옵션 추가)
-            folder = service.files().get(
-                fileId=TARGET_FOLDER_ID,
-                supportsAllDrives=True  # <--- 이게 핵심입니다!
-            ).execute()
-            print(f"✅ [접속 성공] 폴더 이름: '{folder['name']}'")
-        except Exception as e:
-            print(f"❌ [접속 실패] 폴더를 못 찾았습니다. ID를 다시 확인해주세요.")
-            print(f"   에러: {e}")
-            return
-
-        print("🔍 파일 스캔 중...")
-        
-        # 파일 목록 가져오기 (공유 드라이브 지원 옵션 추가)
-        query = f"'{TARGET_FOLDER_ID}' in parents and trashed = false"
-        results = service.files().list(
-            q=query,
-            fields="files(id, name, mimeType)",
-            supportsAllDrives=True,         # <--- 필수
-            includeItemsFromAllDrives=True  # <--- 필수
-        ).execute()
-        
-        files = results.get('files', [])
-
-        print(f"📊 발견된 파일: {len(files)}개")
-        
-        if files:
-            for f in files:
-                print(f"   - {f['name']}")
-        else:
-            print("⚠️ 폴더가 비어 있습니다 (혹은 권한 문제).")
-
+        report = diagnose_all(service, folders)
     except Exception as e:
         print(f"❌ 시스템 에러: {e}")
+        return None
+    print_report(report)
+    return report
+
 
 if __name__ == "__main__":
-    run_diagnosis()
\ No newline at end of file
+    result = run_diagnosis(sys.argv[1:])
+    ok = result is not None and all(r.get("ok") for r in result["folders"].values())
+    sys.exit(0 if ok else 1)
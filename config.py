@@ -0,0 +1,120 @@
+import os
+import threading
+
+# ---------------------------------------------------------
+# [설정] 환경 변수/.env/서비스 계정 경로를 시작할 때 한 번만 읽어서 보관
+#  - import 시점에는 파일/네트워크/디렉터리 생성 같은 부작용 없음
+# ---------------------------------------------------------
+SERVICE_ACCOUNT_PATHS = (
+    "service_account.json",                 # 로컬 개발용 (같은 폴더)
+    "/etc/secrets/service_account.json",    # Render 비밀 파일
+)
+
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def find_service_account(paths=SERVICE_ACCOUNT_PATHS):
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _positive(name, value):
+    # 0/음수면 시작할 때 바로 알림 (예: RPM 0 -> 토큰 버킷 대기 시간 계산에서 0으로 나눔)
+    if value <= 0:
+        raise ValueError(f"{name}은(는) 0보다 커야 합니다: {value}")
+    return value
+
+
+class Config:
+    def __init__(self, env):
+        get = env.get
+
+        # 구글 드라이브 폴더 ID
+        self.id_inbox = get("ID_INBOX", "1cYHh2k40_vyasnu__LbesA4WwAJOsSFo")
+        self.id_draft = get("ID_DRAFT", "1qMKhGRMXNHK98d7dIPLzandxCv6eEESt")
+        self.id_archive = get("ID_ARCHIVE", "1MumtL0X8FslSW2r-oh7B2NMmJGsmCLeU")  # 처리된 원본 보관용
+        self.inbox_drive_id = get("INBOX_DRIVE_ID")  # 공유 드라이브 ID (설정하면 해당 드라이브의 변경분만 조회)
+        self.service_account_file = get("SERVICE_ACCOUNT_FILE") or find_service_account()
+
+        # AI / 업스케일
+        self.nanobanana_api_key = get("NANOBANANA_API_KEY")
+        self.model_name = get("MODEL_NAME", "gemini-3-pro-image-preview")
+        self.magnific_api_key = get("MAGNIFIC_API_KEY")
+        self.magnific_endpoint = get("MAGNIFIC_ENDPOINT", "https://api.freepik.com/v1/ai/image-upscaler")
+        self.magnific_webhook_url = get("MAGNIFIC_WEBHOOK_URL")
+        self.magnific_webhook_port = int(get("MAGNIFIC_WEBHOOK_PORT", "8081"))
+        self.magnific_webhook_secret = get("MAGNIFIC_WEBHOOK_SECRET")  # 비우면 시작할 때마다 새로 만듦
+        self.gemini_rpm = _positive("GEMINI_RPM", float(get("GEMINI_RPM", "20")))
+        self.gemini_concurrency = _positive("GEMINI_CONCURRENCY", int(get("GEMINI_CONCURRENCY", "6")))
+        self.magnific_rpm = _positive("MAGNIFIC_RPM", float(get("MAGNIFIC_RPM", "30")))
+        self.magnific_concurrency = _positive("MAGNIFIC_CONCURRENCY", int(get("MAGNIFIC_CONCURRENCY", "6")))
+
+        # 변형 생성
+        self.variant_count = int(get("VARIANT_COUNT", "3"))
+        self.variant_workers = int(get("VARIANT_WORKERS", "3"))
+        self.speculative_variants = int(get("SPECULATIVE_VARIANTS", "0"))
+        # 실패/품질 탈락한 후보를 대신할 추가 후보까지 합친 한 작업의 최대 후보 수 (0 -> SPECULATIVE_VARIANTS의 2배)
+        self.speculative_max_candidates = int(get("SPECULATIVE_MAX_CANDIDATES", "0")) or 2 * self.speculative_variants
+        self.quality_filter = get("QUALITY_FILTER", "0") == "1"
+        self.quality_min_distance = int(get("QUALITY_MIN_DISTANCE", "3"))
+
+        # 스케줄러 / 장부 / 여러 인스턴스
+        self.job_workers = int(get("JOB_WORKERS", "2"))
+        self.poll_interval = int(get("POLL_INTERVAL", "10"))
+        self.poll_interval_max = int(get("POLL_INTERVAL_MAX", "60"))
+        self.job_max_attempts = int(get("JOB_MAX_ATTEMPTS", "3"))
+        self.lease_backend = get("LEASE_BACKEND", "none")
+        self.lease_ttl = int(get("LEASE_TTL", "300"))
+
+        # 계측 / 메모리 / 파일
+        self.metrics_port = int(get("METRICS_PORT", get("PORT", "9100")))  # Render 웹 서비스면 PORT 사용
+        # /admin/* 는 metrics와 다른 포트(기본 127.0.0.1)에서만. 토큰을 설정하면 주소와 관계없이 항상 필요
+        self.admin_host = get("ADMIN_HOST", "127.0.0.1")
+        self.admin_port = int(get("ADMIN_PORT", "9101"))
+        self.admin_token = get("ADMIN_TOKEN")
+        if self.admin_port == self.metrics_port:
+            raise ValueError(f"ADMIN_PORT는 METRICS_PORT와 달라야 합니다: {self.admin_port}")
+        if self.admin_host not in LOOPBACK_HOSTS and not self.admin_token:
+            raise ValueError(f"ADMIN_HOST={self.admin_host}로 열려면 ADMIN_TOKEN이 필요합니다")
+        self.metrics_log = get("METRICS_LOG", os.path.join("logs", "events.jsonl"))
+        self.memory_budget_mb = int(get("MEMORY_BUDGET_MB", "192"))
+        self.moodboard_cache_mb = int(get("MOODBOARD_CACHE_MB", "32"))
+        self.image_target_size = tuple(int(v) for v in get("IMAGE_TARGET_SIZE", "1920x1080").split("x"))
+        self.image_draft_gap = float(get("IMAGE_DRAFT_GAP", "1.0"))
+        self.image_backend = get("IMAGE_BACKEND", "auto").lower()
+        self.assets_dir = get("ASSETS_DIR", "assets")
+        self.catalog_check_interval = float(get("CATALOG_CHECK_INTERVAL", "30"))  # assets 변경 확인 주기(초)
+        self.empty_room_cache_dir = get("EMPTY_ROOM_CACHE_DIR", os.path.join("cache", "empty_room"))
+        self.empty_room_cache_mb = int(get("EMPTY_ROOM_CACHE_MB", "512"))
+        self.render_cache_dir = get("RENDER_CACHE_DIR", os.path.join("cache", "furnished"))
+        self.render_cache_mb = int(get("RENDER_CACHE_MB", "1024"))
+        self.render_cache_ttl_hours = float(get("RENDER_CACHE_TTL_HOURS", "72"))
+        self.upscale_cache_dir = get("UPSCALE_CACHE_DIR", os.path.join("cache", "upscaled"))
+        self.upscale_cache_mb = int(get("UPSCALE_CACHE_MB", "2048"))
+        self.upscale_cache_ttl_hours = float(get("UPSCALE_CACHE_TTL_HOURS", "72"))
+
+    @classmethod
+    def from_env(cls):
+        from dotenv import load_dotenv
+        load_dotenv()
+        return cls(os.environ)
+
+
+class Lazy:
+    # 처음 속성에 접근할 때 만들어지는 객체 (DB 열기/폴더 스캔 등을 import 시점에서 첫 사용 시점으로 미룸)
+    def __init__(self, factory):
+        self._factory = factory
+        self._lock = threading.Lock()
+        self._obj = None
+
+    def instance(self):
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return self._obj
+
+    def __getattr__(self, name):
+        return getattr(self.instance(), name)
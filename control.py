@@ -0,0 +1,118 @@
+import hmac
+
+from metrics import add_route, log_event
+
+# ---------------------------------------------------------
+# [운영 제어] /admin/* HTTP API (metrics와 다른 관리 포트 ADMIN_HOST:ADMIN_PORT, CLI는 admin.py)
+#  - 작업 목록: 대기 / 처리 중 / 최근 끝난 작업(실패 포함) + 단계별 소요 시간, 격리(dead) 작업
+#  - pause / drain / resume / poll(바로 조회)
+#  - 재시작 없이 설정 변경: 워커 수, 감시 주기, 제공자별 분당 호출 수/동시 호출 수
+#  - 드라이브 진단 (INBOX/DRAFT/ARCHIVE 병렬), 스타일 카탈로그 조회/다시 읽기
+#  접근: ADMIN_TOKEN을 설정했으면 항상 "Authorization: Bearer ADMIN_TOKEN" 필요
+#        (같은 호스트의 리버스 프록시를 거치면 127.0.0.1로 보이므로 요청 주소는 믿지 않음)
+#        토큰이 없으면 관리 포트가 127.0.0.1에만 열려 있을 때만 허용 (config에서 확인)
+# ---------------------------------------------------------
+
+
+class ControlPlane:
+    def __init__(self, scheduler, settings, ledger=None, diagnose=None, catalog=None, status_extra=None, token=None):
+        self.scheduler = scheduler
+        self.settings = settings          # 이름 -> (읽기 함수, 쓰기 함수, 형 변환)
+        self.ledger = ledger
+        self.diagnose = diagnose          # () -> 진단 결과 dict
+        self.catalog = catalog            # style_catalog.StyleCatalog
+        self.status_extra = status_extra  # () -> 상태에 덧붙일 dict (제공자/캐시/메모리 등)
+        self.token = token
+
+    # ---- 접근 제어 ----
+    def allowed(self, request):
+        if not self.token:
+            return True
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {self.token}")
+
+    # ---- 설정 ----
+    def current_settings(self):
+        return {name: get() for name, (get, _, _) in self.settings.items()}
+
+    def update_settings(self, changes):
+        unknown = sorted(set(changes) - set(self.settings))
+        if unknown:
+            raise ValueError(f"알 수 없는 설정: {', '.join(unknown)} (가능: {', '.join(self.settings)})")
+        # 전부 검사한 뒤 적용 (일부만 바뀌는 일이 없도록) - 모든 설정은 양수
+        parsed = {}
+        for name, value in changes.items():
+            value = self.settings[name][2](value)
+            if value <= 0:
+                raise ValueError(f"{name}은(는) 0보다 커야 합니다: {value}")
+            parsed[name] = value
+        for name, value in parsed.items():
+            self.settings[name][1](value)
+        log_event("control", action="settings", changes=parsed)
+        # 바뀐 감시 주기/워커 수로 바로 한 번 조회
+        self.scheduler.wake()
+        return self.current_settings()
+
+    # ---- 조회 ----
+    def status(self):
+        status = self.scheduler.status()
+        status["drained"] = self.scheduler.drained()
+        status["settings"] = self.current_settings()
+        if self.status_extra:
+            status.update(self.status_extra())
+        return status
+
+    def jobs(self, limit=50):
+        jobs = self.scheduler.jobs(limit)
+        if self.ledger is not None:
+            jobs["dead"] = self.ledger.list_jobs("dead", limit)
+        return jobs
+
+    def retry(self, file_id):
+        # 격리(dead)된 작업을 다시 받도록 풀어줌 (다음 전체 조회 때 대기열에 들어감)
+        if self.ledger is None:
+            raise ValueError("작업 장부가 없습니다")
+        if not file_id:
+            raise ValueError("file_id가 필요합니다")
+        self.ledger.retry(file_id)
+        log_event("control", action="retry", file_id=file_id)
+        return {"file_id": file_id, "status": "running"}
+
+    def reload_catalog(self):
+        # assets/styles_config를 바꾼 뒤 재시작 없이 다시 컴파일
+        summary = self.catalog.reload().summary()
+        log_event("control", action="reload_catalog", routes=summary["routes"], problems=len(summary["problems"]))
+        return summary
+
+    def action(self, name):
+        getattr(self.scheduler, name)()
+        log_event("control", action=name)
+        return self.status()
+
+    # ---- HTTP ----
+    def _guard(self, fn):
+        def route(request):
+            if not self.allowed(request):
+                return 403, {"error": "forbidden"}
+            return 200, fn(request)
+        return route
+
+    def register(self):
+        routes = {
+            ("GET", "/admin/status"): lambda req: self.status(),
+            ("GET", "/admin/jobs"): lambda req: self.jobs(int(req.query.get("limit", 50))),
+            ("GET", "/admin/settings"): lambda req: self.current_settings(),
+            ("POST", "/admin/settings"): lambda req: self.update_settings(req.read_json()),
+            ("POST", "/admin/pause"): lambda req: self.action("pause"),
+            ("POST", "/admin/resume"): lambda req: self.action("resume"),
+            ("POST", "/admin/drain"): lambda req: self.action("drain"),
+            ("POST", "/admin/poll"): lambda req: self.action("wake"),
+            ("POST", "/admin/retry"): lambda req: self.retry(req.read_json().get("file_id")),
+        }
+        if self.diagnose:
+            routes[("GET", "/admin/drive")] = lambda req: self.diagnose()
+        if self.catalog is not None:
+            routes[("GET", "/admin/catalog")] = lambda req: self.catalog.summary()
+            routes[("POST", "/admin/catalog/reload")] = lambda req: self.reload_catalog()
+        for (method, path), fn in routes.items():
+            add_route(method, path, self._guard(fn))
+        return self
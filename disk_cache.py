@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+
+# ---------------------------------------------------------
+# [디스크 캐시] 내용 해시(sha256) 기반 영구 캐시 + 용량 기준 LRU 삭제 + 선택: 유효 기간(TTL)
+#  파일 mtime = 저장 시각(TTL 기준), atime = 마지막 사용 시각(LRU 기준)
+# ---------------------------------------------------------
+def make_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        # 길이를 함께 넣어 ("ab","c") 와 ("a","bc") 가 같은 키가 되지 않도록 함
+        h.update(len(part).to_bytes(8, "big"))
+        h.update(part)
+    return h.hexdigest()
+
+
+class DiskCache:
+    def __init__(self, root, max_bytes, suffix=".bin", ttl=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.ttl = ttl  # 초 (None이면 만료 없음)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (size, 마지막 사용 시각, 저장 시각)
+        os.makedirs(root, exist_ok=True)
+        self._load_index()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + self.suffix)
+
+    def _load_index(self):
+        for name in os.listdir(self.root):
+            if not name.endswith(self.suffix):
+                continue
+            st = os.stat(os.path.join(self.root, name))
+            self._entries[name[:-len(self.suffix)]] = (st.st_size, max(st.st_atime, st.st_mtime), st.st_mtime)
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _remove(self, key):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        del self._entries[key]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            now = time.time()
+            if self._expired(entry[2], now):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            os.utime(path, (now, entry[2]))  # 재시작 후에도 LRU 순서가 유지되도록 atime만 갱신
+            self._entries[key] = (len(data), now, entry[2])
+            self.hits += 1
+            return data
+
+    def put(self, key, data):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock:
+            self._entries[key] = (len(data), now, now)
+            self._evict()
+
+    def _evict(self):
+        now = time.time()
+        for key, (_, _, created) in list(self._entries.items()):
+            if self._expired(created, now):
+                self._remove(key)
+                self.expirations += 1
+        total = sum(size for size, _, _ in self._entries.values())
+        if total <= self.max_bytes:
+            return
+        for key, (size, _, _) in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self._entries),
+                "bytes": sum(size for size, _, _ in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
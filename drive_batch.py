@@ -0,0 +1,157 @@
+import random
+import threading
+import time
+
+import google_auth_httplib2
+import httplib2
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+
+from metrics import API_CALLS
+
+# ---------------------------------------------------------
+# [드라이브 공용 서비스] 스레드 여러 개가 함께 써도 안전한 service 1개
+#  (요청마다 새 AuthorizedHttp를 붙이는 방식 - googleapiclient 공식 권장)
+# ---------------------------------------------------------
+def build_shared_service(creds):
+    def build_request(http, *args, **kwargs):
+        new_http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        return HttpRequest(new_http, *args, **kwargs)
+
+    from googleapiclient.discovery import build
+
+    authorized_http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+    # 패키지에 포함된 discovery 문서 사용 (시작할 때마다 네트워크로 받지 않음)
+    return build('drive', 'v3', requestBuilder=build_request, http=authorized_http,
+                 static_discovery=True, cache_discovery=False)
+
+
+RETRYABLE_STATUS = (403, 429, 500, 502, 503, 504)
+
+
+def is_retryable(exc):
+    if isinstance(exc, HttpError):
+        return exc.resp.status in RETRYABLE_STATUS
+    return isinstance(exc, (OSError, httplib2.HttpLib2Error))
+
+
+# ---------------------------------------------------------
+# [배치 처리] 보관함 이동/메타데이터 변경을 모아서 한 번의 batch 요청으로 전송
+# ---------------------------------------------------------
+class _BatchItem:
+    def __init__(self, make_request, on_success, on_error, label):
+        self.make_request = make_request  # service -> HttpRequest (재시도 때 다시 생성)
+        self.on_success = on_success
+        self.on_error = on_error
+        self.label = label
+        self.attempts = 0
+        self.not_before = 0.0
+
+
+class DriveBatcher:
+    def __init__(self, service, flush_interval=2.0, max_batch=50, max_retries=3, backoff=2.0):
+        self.service = service
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch  # Drive batch 최대 100건, 여유 있게 50건
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._pending = []
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.sent_batches = 0
+        self.sent_items = 0
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="drive-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, make_request, on_success=None, on_error=None, label=""):
+        with self._cond:
+            self._pending.append(_BatchItem(make_request, on_success, on_error, label))
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+
+    def move_file(self, file_id, old_folder_id, new_folder_id, on_success=None, on_error=None):
+        def make_request(service):
+            return service.files().update(
+                fileId=file_id,
+                addParents=new_folder_id,
+                removeParents=old_folder_id,
+                fields='id',
+                supportsAllDrives=True
+            )
+        self.submit(make_request, on_success, on_error, label=f"move {file_id}")
+
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"\n❌ 드라이브 배치 에러: {e}")
+
+    def _take_ready(self):
+        now = time.monotonic()
+        with self._cond:
+            ready = [item for item in self._pending if item.not_before <= now][:self.max_batch]
+            for item in ready:
+                self._pending.remove(item)
+        return ready
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                items = self._take_ready()
+                if not items:
+                    return
+                self._send(items)
+
+    def _send(self, items):
+        by_id, handled = {}, set()
+
+        def callback(request_id, response, exception):
+            item = by_id[request_id]
+            handled.add(request_id)
+            if exception is not None:
+                self._retry_or_fail(item, exception)
+                return
+            try:
+                if item.on_success:
+                    item.on_success(response)
+            except Exception as e:
+                print(f"\n❌ 배치 콜백 에러 ({item.label}): {e}")
+
+        batch = self.service.new_batch_http_request(callback=callback)
+        for n, item in enumerate(items):
+            item.attempts += 1
+            by_id[str(n)] = item
+            batch.add(item.make_request(self.service), request_id=str(n))
+        try:
+            API_CALLS.inc(provider="drive", operation="batch")
+            batch.execute()
+            self.sent_batches += 1
+            self.sent_items += len(items)
+        except Exception as e:
+            # 배치 요청 자체가 실패하면 전체를 다시 대기열로
+            for request_id, item in by_id.items():
+                if request_id not in handled:
+                    self._retry_or_fail(item, e)
+
+    def _retry_or_fail(self, item, exc):
+        if is_retryable(exc) and item.attempts < self.max_retries:
+            delay = self.backoff * (2 ** (item.attempts - 1)) * random.uniform(0.5, 1.0)
+            item.not_before = time.monotonic() + delay
+            with self._cond:
+                self._pending.append(item)
+            return
+        print(f"\n❌ 드라이브 작업 실패 ({item.label}): {exc}")
+        if item.on_error:
+            item.on_error(exc)
@@ -0,0 +1,163 @@
+import json
+import os
+import time
+
+# ---------------------------------------------------------
+# [INBOX 감시] Drive changes API 기반 (전체 목록 조회 대신 변경분만 가져옴)
+#  - 이름/내용(md5)이 그대로인 변경은 무시: lease 갱신(appProperties)마다 모든 인스턴스가 다시 받는 일 방지
+# ---------------------------------------------------------
+IMAGE_QUERY = "mimeType contains 'image/'"
+FILE_FIELDS = "id, name, mimeType, md5Checksum, size"
+CHANGE_FIELDS = ("nextPageToken, newStartPageToken, "
+                 "changes(fileId, removed, file(id, name, mimeType, md5Checksum, size, parents, trashed))")
+
+
+def list_folder_images(service, folder_id, page_size=1000):
+    # 전체 목록 조회 (페이지 끝까지) - 이미지 필터는 서버에서 처리
+    query = f"'{folder_id}' in parents and trashed = false and {IMAGE_QUERY}"
+    files, page_token = [], None
+    while True:
+        results = service.files().list(
+            q=query,
+            fields=f"nextPageToken, files({FILE_FIELDS})",
+            pageSize=page_size,
+            pageToken=page_token,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ).execute()
+        files.extend(results.get('files', []))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def find_outputs(service, folder_id, job_key):
+    # appProperties는 Drive에서 색인되므로 폴더 전체를 훑지 않고 쿼리 1번으로 조회
+    query = (f"'{folder_id}' in parents and trashed = false and "
+             f"appProperties has {{ key='job_key' and value='{job_key}' }}")
+    results = service.files().list(
+        q=query,
+        fields="files(id, name, appProperties)",
+        pageSize=100,
+        supportsAllDrives=True,
+        includeItemsFromAllDrives=True
+    ).execute()
+    return results.get('files', [])
+
+
+class InboxWatcher:
+    def __init__(self, service, folder_id, state_path=os.path.join("state", "drive_watch.json"),
+                 drive_id=None, min_interval=5, max_interval=60, resync_interval=600, page_size=1000):
+        self.service = service
+        self.folder_id = folder_id
+        self.state_path = state_path
+        self.drive_id = drive_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.resync_interval = resync_interval
+        self.page_size = page_size
+        self.interval = min_interval
+        self.page_token = self._load_token()
+        self._last_resync = None
+        self._seen = {}  # file_id -> (name, md5Checksum): 마지막으로 넘긴 INBOX 파일
+
+    # ---- 시작 토큰 저장/복원 ----
+    def _load_token(self):
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if state.get("folder_id") != self.folder_id:
+            return None
+        return state.get("start_page_token")
+
+    def _save_token(self, token):
+        self.page_token = token
+        folder = os.path.dirname(self.state_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"folder_id": self.folder_id, "start_page_token": token}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _drive_kwargs(self):
+        kwargs = {"supportsAllDrives": True}
+        if self.drive_id:
+            kwargs["driveId"] = self.drive_id
+        return kwargs
+
+    # ---- 조회 ----
+    def _start_token(self):
+        return self.service.changes().getStartPageToken(**self._drive_kwargs()).execute()["startPageToken"]
+
+    def _is_inbox_image(self, change):
+        file = change.get("file")
+        if change.get("removed") or not file or file.get("trashed"):
+            return False
+        return self.folder_id in file.get("parents", []) and file.get("mimeType", "").startswith("image/")
+
+    def _read_changes(self):
+        found, page_token = {}, self.page_token
+        while True:
+            results = self.service.changes().list(
+                pageToken=page_token,
+                pageSize=self.page_size,
+                fields=CHANGE_FIELDS,
+                includeItemsFromAllDrives=True,
+                **self._drive_kwargs()
+            ).execute()
+            for change in results.get("changes", []):
+                if not self._is_inbox_image(change):
+                    self._seen.pop(change.get("fileId"), None)
+                    continue
+                file = change["file"]
+                fingerprint = (file.get("name"), file.get("md5Checksum"))
+                if self._seen.get(file["id"]) == fingerprint:
+                    continue
+                self._seen[file["id"]] = fingerprint
+                found[file["id"]] = {k: file[k] for k in ("id", "name", "mimeType", "md5Checksum", "size") if k in file}
+            if "newStartPageToken" in results:
+                self._save_token(results["newStartPageToken"])
+                return list(found.values())
+            page_token = results["nextPageToken"]
+
+    def _resync(self):
+        # 토큰을 먼저 받아두고 전체 목록을 읽어야 그 사이에 올라온 파일을 놓치지 않음
+        token = self._start_token()
+        files = list_folder_images(self.service, self.folder_id, self.page_size)
+        self._save_token(token)
+        self._last_resync = time.monotonic()
+        self._seen = {f["id"]: (f.get("name"), f.get("md5Checksum")) for f in files}
+        return files
+
+    def poll(self):
+        # 시작 후 첫 조회(저장된 토큰이 있어도 -> 재시작 전에 처리 중이던 파일을 바로 다시 받음)
+        # + 주기적으로 전체 목록을 다시 읽음 (실패해서 INBOX에 남은 파일 재시도)
+        if (self.page_token is None or self._last_resync is None
+                or time.monotonic() - self._last_resync >= self.resync_interval):
+            files = self._resync()
+        else:
+            files = self._read_changes()
+        self._adapt(bool(files))
+        return files
+
+    def _adapt(self, active):
+        # 새 파일이 있으면 바로 짧은 주기로, 한가하면 점점 길게
+        if active:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * 1.5)
+
+    def next_interval(self):
+        return self.interval
+
+    def set_intervals(self, min_interval=None, max_interval=None):
+        # 운영 중 감시 주기 변경 (다음 조회부터 적용)
+        if min_interval is not None:
+            self.min_interval = max(1, min_interval)
+        if max_interval is not None:
+            self.max_interval = max_interval
+        self.max_interval = max(self.min_interval, self.max_interval)
+        self.interval = min(max(self.interval, self.min_interval), self.max_interval)
@@ -0,0 +1,120 @@
+import argparse
+import asyncio
+import base64
+import itertools
+
+import aiohttp
+from aiohttp import web
+
+# ---------------------------------------------------------
+# [테스트용] Freepik /ai/image-upscaler 흉내 서버 (네트워크 없이 처리량 측정)
+#  mode: immediate | queued | failed | 401 | 402
+# ---------------------------------------------------------
+MODES = ("immediate", "queued", "failed", "401", "402")
+API_PATH = "/v1/ai/image-upscaler"
+
+
+class FakeMagnific:
+    def __init__(self, mode="immediate", queue_polls=2, latency=0.0, webhook_delay=0.05, fail_downloads=0):
+        if mode not in MODES:
+            raise ValueError(f"알 수 없는 mode: {mode} ({', '.join(MODES)})")
+        self.mode = mode
+        self.queue_polls = queue_polls
+        self.latency = latency
+        self.webhook_delay = webhook_delay
+        self.fail_downloads = fail_downloads  # 처음 N번의 다운로드는 503
+        self.base_url = None
+        self.tasks = {}
+        self.images = {}
+        self.requests = {"submit": 0, "status": 0, "download": 0}
+        self._ids = itertools.count(1)
+
+    def create_app(self):
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post(API_PATH, self._submit)
+        app.router.add_get(API_PATH + "/{task_id}", self._status)
+        app.router.add_get("/files/{task_id}.jpg", self._download)
+        return app
+
+    async def _submit(self, request):
+        self.requests["submit"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.mode == "401" or not request.headers.get("x-freepik-api-key"):
+            return web.json_response({"message": "Invalid API key"}, status=401)
+        if self.mode == "402":
+            return web.json_response({"message": "Payment required"}, status=402)
+
+        body = await request.json()
+        task_id = f"task-{next(self._ids)}"
+        self.images[task_id] = base64.b64decode(body["image"])
+        url = f"{self.base_url}/files/{task_id}.jpg"
+
+        if self.mode == "immediate":
+            return web.json_response({"data": {"task_id": task_id, "status": "COMPLETED", "generated": [url]}})
+
+        self.tasks[task_id] = {"polls": 0, "url": url}
+        if body.get("webhook_url"):
+            asyncio.get_running_loop().create_task(self._send_webhook(body["webhook_url"], task_id))
+        return web.json_response({"data": {"task_id": task_id, "status": "IN_PROGRESS", "generated": []}})
+
+    def _task_state(self, task_id):
+        task = self.tasks[task_id]
+        if task["polls"] < self.queue_polls:
+            return {"task_id": task_id, "status": "IN_PROGRESS", "generated": []}
+        if self.mode == "failed":
+            return {"task_id": task_id, "status": "FAILED", "message": "fake failure", "generated": []}
+        return {"task_id": task_id, "status": "COMPLETED", "generated": [task["url"]]}
+
+    async def _status(self, request):
+        self.requests["status"] += 1
+        task_id = request.match_info["task_id"]
+        if task_id not in self.tasks:
+            return web.json_response({"message": "Not found"}, status=404)
+        self.tasks[task_id]["polls"] += 1
+        return web.json_response({"data": self._task_state(task_id)})
+
+    async def _send_webhook(self, webhook_url, task_id):
+        await asyncio.sleep(self.webhook_delay)
+        self.tasks[task_id]["polls"] = self.queue_polls
+        async with aiohttp.ClientSession() as session:
+            await session.post(webhook_url, json=self._task_state(task_id))
+
+    async def _download(self, request):
+        self.requests["download"] += 1
+        if self.fail_downloads:
+            self.fail_downloads -= 1
+            return web.Response(status=503)
+        task_id = request.match_info["task_id"]
+        if task_id not in self.images:
+            return web.Response(status=404)
+        return web.Response(body=self.images.pop(task_id), content_type="image/jpeg")
+
+    async def start(self, host="127.0.0.1", port=0):
+        runner = web.AppRunner(self.create_app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://{host}:{port}"
+        return runner
+
+    @property
+    def endpoint(self):
+        return self.base_url + API_PATH
+
+
+async def _serve(mode, host, port):
+    fake = FakeMagnific(mode=mode)
+    await fake.start(host, port)
+    print(f"🧪 가짜 매그니픽 서버 ({mode}): {fake.endpoint}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Freepik image-upscaler 흉내 서버")
+    parser.add_argument("--mode", choices=MODES, default="immediate")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.mode, args.host, args.port))
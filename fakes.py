@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import io
+import itertools
+import re
+import threading
+import time
+
+import httplib2
+from PIL import Image
+
+from fake_magnific import FakeMagnific
+from magnific_client import BackgroundUpscaler, MagnificClient
+
+# ---------------------------------------------------------
+# [가짜 백엔드] 크레딧 없이 bot.py 전체 파이프라인을 돌리기 위한 로컬 대역
+#  - FakeDrive: files() / changes() / new_batch_http_request
+#  - FakeGeminiModel: generate_content -> 지연 후 이미지 1장
+#  - start_fake_upscaler: fake_magnific 서버 + 실제 MagnificClient
+# ---------------------------------------------------------
+def make_test_jpeg(width=1920, height=1080, seed=0, quality=90):
+    # 단색 이미지는 JPEG가 너무 작아지므로 그라데이션 + 노이즈로 실제 사진 크기에 가깝게
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    noise = Image.effect_noise((width, height), 40 + seed % 20).convert("RGB")
+    img = Image.blend(img, noise, 0.4)
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+class _Request:
+    def __init__(self, fn, latency=0.0):
+        self._fn = fn
+        self._latency = latency
+
+    def execute(self, *args, **kwargs):
+        if self._latency:
+            time.sleep(self._latency)
+        return self._fn()
+
+    def next_chunk(self, *args, **kwargs):
+        return None, self.execute()
+
+
+class _MediaHttp:
+    # MediaIoBaseDownload가 호출하는 http.request(uri, method, headers=...) 흉내 (Range 지원)
+    def __init__(self, data, latency):
+        self._data = data
+        self._latency = latency
+
+    def request(self, uri, method="GET", headers=None, **kwargs):
+        if self._latency:
+            time.sleep(self._latency)
+        total = len(self._data)
+        match = re.match(r"bytes=(\d+)-(\d+)", (headers or {}).get("range", ""))
+        start, end = (int(match.group(1)), int(match.group(2))) if match else (0, total - 1)
+        chunk = self._data[start:end + 1]
+        resp = httplib2.Response({
+            "status": 206,
+            "content-range": f"bytes {start}-{start + len(chunk) - 1}/{total}",
+        })
+        return resp, chunk
+
+
+class _MediaRequest:
+    def __init__(self, file_id, data, latency):
+        self.uri = f"fake://drive/{file_id}"
+        self.headers = {}
+        self.http = _MediaHttp(data, latency)
+
+
+class _FakeFiles:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def list(self, q="", fields=None, pageSize=100, pageToken=None, **kwargs):
+        def run():
+            matches = [f for f in self._drive.snapshot() if self._drive.matches(f, q)]
+            start = int(pageToken or 0)
+            page = matches[start:start + pageSize]
+            result = {"files": [self._drive.public(f) for f in page]}
+            if start + pageSize < len(matches):
+                result["nextPageToken"] = str(start + pageSize)
+            return result
+        return _Request(run, self._drive.latency)
+
+    def get(self, fileId, **kwargs):
+        return _Request(lambda: self._drive.public(self._drive.file(fileId)), self._drive.latency)
+
+    def get_media(self, fileId, **kwargs):
+        return _MediaRequest(fileId, self._drive.file(fileId)["data"], self._drive.latency)
+
+    def create(self, body, media_body=None, fields=None, **kwargs):
+        def run():
+            data = media_body.getbytes(0, media_body.size()) if media_body is not None else b""
+            file = self._drive.add_file(body["name"], data, parents=body.get("parents", []),
+                                        mime_type=body.get("mimeType", "image/jpeg"),
+                                        app_properties=body.get("appProperties"))
+            return {"id": file["id"]}
+        return _Request(run, self._drive.latency)
+
+    def update(self, fileId, body=None, addParents=None, removeParents=None, **kwargs):
+        def run():
+            return self._drive.update_file(fileId, body, addParents, removeParents)
+        return _Request(run, self._drive.latency)
+
+
+class _FakeChanges:
+    def __init__(self, drive):
+        self._drive = drive
+
+    def getStartPageToken(self, **kwargs):
+        return _Request(lambda: {"startPageToken": str(self._drive.change_count())}, self._drive.latency)
+
+    def list(self, pageToken, pageSize=100, **kwargs):
+        def run():
+            start = int(pageToken)
+            changes = self._drive.changes_since(start, pageSize)
+            result = {"changes": changes}
+            if start + len(changes) < self._drive.change_count():
+                result["nextPageToken"] = str(start + len(changes))
+            else:
+                result["newStartPageToken"] = str(self._drive.change_count())
+            return result
+        return _Request(run, self._drive.latency)
+
+
+class _FakeBatch:
+    def __init__(self, callback, latency):
+        self._callback = callback
+        self._latency = latency
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        self._requests.append((request_id, request, callback))
+
+    def execute(self, http=None):
+        if self._latency:
+            time.sleep(self._latency)
+        for request_id, request, callback in self._requests:
+            try:
+                response, exc = request.execute(), None
+            except Exception as e:
+                response, exc = None, e
+            (callback or self._callback)(request_id, response, exc)
+
+
+class FakeDrive:
+    # googleapiclient의 drive v3 service 대역 (스레드 안전, 메모리 저장)
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._files = {}
+        self._changes = []
+        self._ids = itertools.count(1)
+        self.calls = {"batch": 0}
+
+    # ---- service 인터페이스 ----
+    def files(self):
+        return _FakeFiles(self)
+
+    def changes(self):
+        return _FakeChanges(self)
+
+    def new_batch_http_request(self, callback=None):
+        self.calls["batch"] += 1
+        return _FakeBatch(callback, self.latency)
+
+    # ---- 저장소 ----
+    def add_file(self, name, data, parents, mime_type="image/jpeg", app_properties=None):
+        with self._lock:
+            file = {
+                "id": f"fake{next(self._ids)}", "name": name, "mimeType": mime_type,
+                "parents": list(parents), "trashed": False, "data": data,
+                "md5Checksum": hashlib.md5(data).hexdigest(), "size": str(len(data)),
+                "appProperties": dict(app_properties or {}), "version": "1",
+            }
+            self._files[file["id"]] = file
+            self._changes.append(file["id"])
+            return file
+
+    def update_file(self, file_id, body=None, add_parents=None, remove_parents=None):
+        with self._lock:
+            file = self._files[file_id]
+            if remove_parents:
+                file["parents"] = [p for p in file["parents"] if p not in remove_parents.split(",")]
+            if add_parents:
+                file["parents"].extend(add_parents.split(","))
+            if body and "name" in body:
+                file["name"] = body["name"]
+            if body and "appProperties" in body:
+                for key, value in body["appProperties"].items():
+                    if value is None:
+                        file["appProperties"].pop(key, None)
+                    else:
+                        file["appProperties"][key] = value
+            file["version"] = str(int(file["version"]) + 1)
+            self._changes.append(file_id)
+            return self.public(file)
+
+    def file(self, file_id):
+        with self._lock:
+            return self._files[file_id]
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._files.values())
+
+    def in_folder(self, folder_id):
+        return [f for f in self.snapshot() if folder_id in f["parents"]]
+
+    def change_count(self):
+        with self._lock:
+            return len(self._changes)
+
+    def changes_since(self, start, limit):
+        with self._lock:
+            ids = self._changes[start:start + limit]
+            return [{"fileId": i, "removed": False, "file": self.public(self._files[i])} for i in ids]
+
+    @staticmethod
+    def public(file):
+        return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v)
+                for k, v in file.items() if k != "data"}
+
+    @staticmethod
+    def matches(file, q):
+        # 봇이 쓰는 쿼리만 해석: '<id>' in parents / mimeType contains / trashed / appProperties has
+        if "trashed = false" in q and file["trashed"]:
+            return False
+        for folder_id in re.findall(r"'([^']+)' in parents", q):
+            if folder_id not in file["parents"]:
+                return False
+        for prefix in re.findall(r"mimeType contains '([^']+)'", q):
+            if prefix not in file["mimeType"]:
+                return False
+        for key, value in re.findall(r"appProperties has \{ key='([^']+)' and value='([^']+)' \}", q):
+            if file["appProperties"].get(key) != value:
+                return False
+        return True
+
+
+class _Blob:
+    def __init__(self, data):
+        self.data = data
+        self.mime_type = "image/jpeg"
+
+
+class _Part:
+    def __init__(self, data):
+        self.inline_data = _Blob(data)
+
+
+class _Response:
+    def __init__(self, parts):
+        self.parts = parts
+
+
+class FakeGeminiModel:
+    # genai.GenerativeModel 대역: 지연 후 입력 크기에 맞는 JPEG 1장을 돌려줌
+    def __init__(self, model_name="fake", delay=0.5, width=1920, height=1080):
+        self.model_name = model_name
+        self.delay = delay
+        self._image = make_test_jpeg(width, height, seed=7)
+        self.calls = 0
+
+    def generate_content(self, contents):
+        self.calls += 1
+        time.sleep(self.delay)
+        return _Response([_Part(self._image)])
+
+
+def start_fake_upscaler(mode="immediate", queue_polls=2, poll_initial=0.2):
+    # 가짜 매그니픽 서버를 전용 루프 스레드에서 띄우고, 실제 클라이언트로 연결
+    fake = FakeMagnific(mode=mode, queue_polls=queue_polls)
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="fake-magnific", daemon=True).start()
+    asyncio.run_coroutine_threadsafe(fake.start(), loop).result()
+    client = MagnificClient("fake-key", endpoint=fake.endpoint, poll_initial=poll_initial, poll_max=1.0)
+    return fake, BackgroundUpscaler(client)
@@ -0,0 +1,174 @@
+import io
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+# ---------------------------------------------------------
+# [이미지 처리] 모든 단계 결과를 TARGET_SIZE(기본 1920x1080, IMAGE_TARGET_SIZE -> configure) 이내 RGB JPEG로 맞춤
+#  - 이미 규격 안의 RGB JPEG면 재인코딩 없이 원본 바이트 그대로
+#  - 큰 휴대폰 사진은 Image.draft()로 JPEG 디코딩 단계에서 1/2~1/8로 줄여서 읽음
+#  - 남은 축소는 reducing_gap으로 정수배 축소 후 LANCZOS
+#  - 선택: pyvips(libvips)가 설치돼 있으면 자동 사용 (IMAGE_BACKEND로 고정 가능)
+# ---------------------------------------------------------
+TARGET_SIZE = (1920, 1080)
+JPEG_QUALITY = 95
+REDUCING_GAP = 2.0
+# draft는 목표 크기 이상을 보장하는 가장 작은 1/2^n 배율을 고름 (1.0 = 목표 크기 바로 위까지)
+DRAFT_GAP = 1.0
+BACKEND_NAME = "auto"
+
+# EXIF Orientation 값 중 가로/세로가 바뀌는 경우
+_SWAPS_AXES = (5, 6, 7, 8)
+_ORIENTATION_TAG = 0x0112
+
+
+class ImageError(Exception):
+    pass
+
+
+def configure(target_size=None, draft_gap=None, backend=None):
+    # 설정(config.Config)은 .env를 읽은 뒤 bot에서 한 번 넘김 (import 시점에는 환경 변수를 읽지 않음)
+    global TARGET_SIZE, DRAFT_GAP, BACKEND_NAME, _backend
+    if target_size is not None:
+        TARGET_SIZE = tuple(target_size)
+    if draft_gap is not None:
+        DRAFT_GAP = draft_gap
+    if backend is not None and backend != BACKEND_NAME:
+        BACKEND_NAME = backend
+        _backend = None
+
+
+def _fit(width, height, box=None):
+    # thumbnail과 같은 규칙: 비율 유지, 확대는 하지 않음
+    box = box or TARGET_SIZE
+    scale = min(box[0] / width, box[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def _orientation(img):
+    try:
+        return img.getexif().get(_ORIENTATION_TAG, 1)
+    except Exception:
+        return 1
+
+
+def _probe(img):
+    # 헤더만 읽고 (회전값, 회전 반영 후 목표 크기, 그대로 통과 가능 여부) 계산
+    orientation = _orientation(img)
+    width, height = img.size
+    if orientation in _SWAPS_AXES:
+        width, height = height, width
+    target = _fit(width, height)
+    passthrough = (img.format == "JPEG" and img.mode == "RGB" and orientation == 1
+                   and (width, height) == target)
+    return orientation, target, passthrough
+
+
+def estimate_memory(data):
+    # 표준화 중 필요한 대략적인 메모리 (입력 + draft 후 디코딩 픽셀 x2(회전 사본) + 결과) - 헤더만 읽음
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            orientation, target, passthrough = _probe(img)
+            if passthrough:
+                return len(data)
+            width, height = img.size
+            if img.format == "JPEG":
+                want = (target[0] * DRAFT_GAP, target[1] * DRAFT_GAP)
+                if orientation in _SWAPS_AXES:
+                    want = want[::-1]
+                scale = 1
+                while scale < 8 and width / (scale * 2) >= want[0] and height / (scale * 2) >= want[1]:
+                    scale *= 2
+                width, height = -(-width // scale), -(-height // scale)
+    except Exception:
+        return len(data)
+    return len(data) + width * height * 3 * 2 + target[0] * target[1] * 3
+
+
+# ---------------------------------------------------------
+# Pillow 백엔드 (Pillow-SIMD도 같은 API라 그대로 빨라짐)
+# ---------------------------------------------------------
+class PillowBackend:
+    name = "pillow"
+
+    def standardize(self, data):
+        with Image.open(io.BytesIO(data)) as img:
+            orientation, target, passthrough = _probe(img)
+            if passthrough:
+                return data
+
+            # DCT 단계 축소: 목표 크기 x DRAFT_GAP 이상을 유지하는 가장 작은 배율로 디코딩
+            if img.format == "JPEG":
+                draft_size = (target[0] * DRAFT_GAP, target[1] * DRAFT_GAP)
+                if orientation in _SWAPS_AXES:
+                    draft_size = draft_size[::-1]
+                img.draft("RGB", tuple(int(v) for v in draft_size))
+
+            img = ImageOps.exif_transpose(img)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            if img.size != target:
+                img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+            buf = io.BytesIO()
+            img.save(buf, "JPEG", quality=JPEG_QUALITY)
+        return buf.getvalue()
+
+
+# ---------------------------------------------------------
+# libvips 백엔드 (shrink-on-load + 자동 회전을 한 번에 처리)
+# ---------------------------------------------------------
+class VipsBackend:
+    name = "vips"
+
+    def __init__(self, pyvips):
+        self._vips = pyvips
+
+    def standardize(self, data):
+        with Image.open(io.BytesIO(data)) as img:
+            if _probe(img)[2]:
+                return data
+        try:
+            out = self._vips.Image.thumbnail_buffer(
+                data, TARGET_SIZE[0], height=TARGET_SIZE[1], size="down")
+            if out.hasalpha():
+                out = out.flatten(background=[255, 255, 255])
+            if out.interpretation != "srgb":
+                out = out.colourspace("srgb")
+            return out.jpegsave_buffer(Q=JPEG_QUALITY, strip=True)
+        except self._vips.Error as e:
+            raise ImageError(f"이미지 처리 실패 (vips): {e}") from e
+
+
+def _load_backend(name):
+    if name in ("auto", "vips"):
+        try:
+            import pyvips
+            return VipsBackend(pyvips)
+        except (ImportError, OSError):
+            if name == "vips":
+                raise
+    return PillowBackend()
+
+
+_backend = None
+
+
+def get_backend():
+    # IMAGE_BACKEND = auto(기본) | pillow | vips
+    global _backend
+    if _backend is None:
+        _backend = _load_backend(BACKEND_NAME)
+    return _backend
+
+
+def set_backend(name):
+    global _backend
+    _backend = _load_backend(name)
+    return _backend
+
+
+def standardize(data):
+    # 해석할 수 없는 이미지는 ImageError (원본을 그대로 흘려보내지 않음)
+    try:
+        return get_backend().standardize(data)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        raise ImageError(f"이미지 처리 실패: {e}") from e
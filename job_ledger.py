@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+# ---------------------------------------------------------
+# [작업 장부] 파일별/단계별 결과를 SQLite에 기록 -> 재시작 시 끝난 단계는 건너뜀
+#  status: running | done | dead (재시도 한도 초과)
+# ---------------------------------------------------------
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    file_id    TEXT PRIMARY KEY,
+    name       TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    file_id     TEXT NOT NULL,
+    stage       TEXT NOT NULL,
+    artifact    TEXT,
+    meta        TEXT,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (file_id, stage)
+);
+"""
+
+
+class JobLedger:
+    def __init__(self, db_path=os.path.join("state", "jobs.sqlite3"),
+                 artifact_dir=os.path.join("state", "artifacts"), max_attempts=3):
+        self.db_path = db_path
+        self.artifact_dir = artifact_dir
+        self.max_attempts = max_attempts
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        os.makedirs(artifact_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    # ---- 작업 ----
+    def begin(self, file_id, name):
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (file_id, name, status, created_at, updated_at) VALUES (?, ?, 'running', ?, ?) "
+            "ON CONFLICT(file_id) DO UPDATE SET name = excluded.name, updated_at = excluded.updated_at",
+            (file_id, name, now, now),
+        )
+        return self.get(file_id)
+
+    def get(self, file_id):
+        rows = self._query("SELECT * FROM jobs WHERE file_id = ?", (file_id,))
+        return dict(rows[0]) if rows else None
+
+    def mark_failed(self, file_id, error):
+        # 실패 횟수가 한도를 넘으면 dead(격리) 상태로 -> 더 이상 자동 재시도하지 않음
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, last_error = ?, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN 'dead' ELSE status END WHERE file_id = ?",
+                (str(error)[:1000], time.time(), self.max_attempts, file_id),
+            )
+        return self.get(file_id)
+
+    def reject(self, file_id, name, error):
+        # 처리할 수 없는 입력 (파일명/스타일 오류) - 다시 해도 같은 결과이므로 바로 dead
+        now = time.time()
+        self._write(
+            "INSERT INTO jobs (file_id, name, status, last_error, created_at, updated_at) VALUES (?, ?, 'dead', ?, ?, ?) "
+            "ON CONFLICT(file_id) DO UPDATE SET name = excluded.name, status = 'dead', "
+            "last_error = excluded.last_error, updated_at = excluded.updated_at",
+            (file_id, name, str(error)[:1000], now, now),
+        )
+
+    def mark_done(self, file_id):
+        self._write("UPDATE jobs SET status = 'done', updated_at = ? WHERE file_id = ?", (time.time(), file_id))
+        shutil.rmtree(os.path.join(self.artifact_dir, file_id), ignore_errors=True)
+
+    def retry(self, file_id):
+        # dead 상태를 수동으로 풀어줄 때
+        self._write("UPDATE jobs SET status = 'running', attempts = 0, updated_at = ? WHERE file_id = ?",
+                    (time.time(), file_id))
+
+    def list_jobs(self, status=None, limit=100):
+        if status:
+            rows = self._query("SELECT * FROM jobs WHERE status = ? ORDER BY updated_at DESC LIMIT ?", (status, limit))
+        else:
+            rows = self._query("SELECT * FROM jobs ORDER BY updated_at DESC LIMIT ?", (limit,))
+        return [dict(row) for row in rows]
+
+    # ---- 단계 ----
+    def _artifact_path(self, file_id, stage):
+        return os.path.join(self.artifact_dir, file_id, f"{stage}.bin")
+
+    def complete_stage(self, file_id, stage, data=None, meta=None):
+        artifact = None
+        if data is not None:
+            artifact = self._artifact_path(file_id, stage)
+            os.makedirs(os.path.dirname(artifact), exist_ok=True)
+            tmp_path = artifact + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, artifact)
+        self._write(
+            "INSERT OR REPLACE INTO stages (file_id, stage, artifact, meta, finished_at) VALUES (?, ?, ?, ?, ?)",
+            (file_id, stage, artifact, json.dumps(meta) if meta is not None else None, time.time()),
+        )
+
+    def stage(self, file_id, stage):
+        rows = self._query("SELECT * FROM stages WHERE file_id = ? AND stage = ?", (file_id, stage))
+        if not rows:
+            return None
+        row = dict(rows[0])
+        row["meta"] = json.loads(row["meta"]) if row["meta"] else None
+        return row
+
+    def is_stage_done(self, file_id, stage):
+        return self.stage(file_id, stage) is not None
+
+    def load_artifact(self, file_id, stage):
+        row = self.stage(file_id, stage)
+        if not row or not row["artifact"]:
+            return None
+        try:
+            with open(row["artifact"], "rb") as f:
+                return f.read()
+        except OSError:
+            return None
@@ -0,0 +1,230 @@
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+
+from metrics import log_event
+
+# ---------------------------------------------------------
+# [작업 임대(lease)] 여러 인스턴스가 같은 INBOX를 나눠 처리하기 위한 선점 표시
+#  - 파일을 처리하기 전에 lease를 잡고, 처리 중에는 백그라운드 스레드가 계속 갱신
+#  - 인스턴스가 죽으면 갱신이 멈추고, 만료된 lease는 다른 인스턴스가 가져감
+#  - 저장소: drive(입력 파일 appProperties) | sqlite(같은 호스트/테스트용) | none(단일 인스턴스)
+# ---------------------------------------------------------
+class LeaseLost(Exception):
+    pass
+
+
+def default_owner():
+    # 재시작하면 새 소유자 -> 이전 프로세스의 lease는 만료 후 회수
+    return os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class NullLeases:
+    # 단일 인스턴스 (기존 동작): 항상 성공
+    name = "none"
+
+    def acquire(self, resource_id, owner, ttl):
+        return True
+
+    def renew(self, resource_id, owner, ttl):
+        return True
+
+    def release(self, resource_id, owner):
+        pass
+
+
+class SqliteLeases:
+    name = "sqlite"
+
+    def __init__(self, db_path=os.path.join("state", "leases.sqlite3")):
+        folder = os.path.dirname(db_path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases ("
+                "resource_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _write(self, sql, params):
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params).rowcount
+
+    def acquire(self, resource_id, owner, ttl):
+        # 비어 있거나, 내 것이거나, 만료된 경우에만 한 문장으로 가져감 (프로세스 간에도 원자적)
+        now = time.time()
+        return self._write(
+            "INSERT INTO leases (resource_id, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(resource_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (resource_id, owner, now + ttl, now),
+        ) == 1
+
+    def renew(self, resource_id, owner, ttl):
+        return self._write(
+            "UPDATE leases SET expires_at = ? WHERE resource_id = ? AND owner = ?",
+            (time.time() + ttl, resource_id, owner),
+        ) == 1
+
+    def release(self, resource_id, owner):
+        self._write("DELETE FROM leases WHERE resource_id = ? AND owner = ?", (resource_id, owner))
+
+
+class DriveLeases:
+    # 입력 파일의 appProperties(lease_owner, lease_expires)에 기록
+    # Drive v3 files.update에는 조건부 쓰기(If-Match)가 없어 진짜 compare-and-set은 불가능 -> 아래 두 가지로 대신함
+    #  1) 읽기 -> 쓰기가 settle보다 오래 걸렸으면 포기: 그 사이 다른 인스턴스가 쓰고 확인까지 끝냈을 수 있음
+    #     (다른 쪽은 쓰고 settle만큼 기다린 뒤 확인하므로, 늦게 도착한 내 쓰기가 그 확인 뒤에 덮어쓰는 일은 이것으로 막힘)
+    #  2) settle 뒤 다시 읽어 소유자가 나이고 version이 내 쓰기 그대로일 때만 확보 (뒤에 쓴 쪽이 있으면 양보)
+    #  충돌하면 내 표시를 지우고 잠시 뒤 다시 시도. 남는 틈(확인 읽기 직후에 도착한 다른 쓰기)은 그쪽이 1)로 포기하고,
+    #  덮어쓰인 이쪽은 다음 갱신(renew)에서 lease를 잃은 것으로 처리 -> 두 인스턴스가 동시에 올리는 일은 없음
+    name = "drive"
+
+    def __init__(self, get_service, settle=1.5, attempts=3):
+        self._get_service = get_service
+        self.settle = settle
+        self.attempts = attempts
+
+    def _read(self, file_id):
+        file = self._get_service().files().get(
+            fileId=file_id, fields="version, appProperties", supportsAllDrives=True
+        ).execute()
+        props = file.get("appProperties") or {}
+        return props.get("lease_owner"), float(props.get("lease_expires") or 0), file.get("version")
+
+    def _write(self, file_id, owner, expires):
+        props = {"lease_owner": owner, "lease_expires": f"{expires:.0f}" if expires else None}
+        return self._get_service().files().update(
+            fileId=file_id, body={"appProperties": props}, fields="version", supportsAllDrives=True
+        ).execute().get("version")
+
+    def acquire(self, resource_id, owner, ttl):
+        for attempt in range(self.attempts):
+            start = time.monotonic()
+            holder, expires, _ = self._read(resource_id)
+            if holder and holder != owner and expires > time.time():
+                return False
+            version = self._write(resource_id, owner, time.time() + ttl)
+            if time.monotonic() - start <= self.settle:
+                time.sleep(self.settle)
+                holder, _, current = self._read(resource_id)
+                if holder == owner and current == version:
+                    return True
+                if holder != owner:
+                    # 뒤에 쓴 인스턴스가 있음 -> 그쪽이 확인을 거쳐 가져감
+                    return False
+            # 충돌 (늦게 도착한 쓰기 / 내 쓰기 뒤에 다른 쓰기) -> 내 표시를 지우고 다시
+            log_event("lease_conflict", resource_id=resource_id, owner=owner, attempt=attempt + 1)
+            self.release(resource_id, owner)
+            time.sleep(random.uniform(0.5, 1.5) * self.settle)
+        return False
+
+    def renew(self, resource_id, owner, ttl):
+        holder, expires, _ = self._read(resource_id)
+        if holder != owner or expires <= time.time():
+            return False
+        self._write(resource_id, owner, time.time() + ttl)
+        # 쓰기가 끝났을 때 이미 만료 시각이 지났다면 그 사이 다른 인스턴스가 가져갔을 수 있음 -> 잃은 것으로 처리
+        return time.time() < expires
+
+    def release(self, resource_id, owner):
+        if self._read(resource_id)[0] == owner:
+            self._write(resource_id, None, None)
+
+
+class Lease:
+    def __init__(self, manager, resource_id):
+        self.resource_id = resource_id
+        self.lost = False
+        self._manager = manager
+
+    def check(self):
+        # 갱신에 실패했다면(다른 인스턴스가 가져감) 더 진행하지 않음
+        if self.lost:
+            raise LeaseLost(f"lease를 잃었습니다: {self.resource_id}")
+
+    def release(self):
+        self._manager.release(self)
+
+
+class LeaseManager:
+    def __init__(self, backend, owner=None, ttl=300, renew_interval=None):
+        self.backend = backend
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.renew_interval = renew_interval or ttl / 3
+        self._lock = threading.Lock()
+        self._held = {}  # resource_id -> Lease
+        self._thread = None
+
+    def claim(self, resource_id):
+        # 다른 인스턴스가 처리 중이면 None
+        try:
+            ok = self.backend.acquire(resource_id, self.owner, self.ttl)
+        except Exception as e:
+            print(f"   ⚠️ lease 확인 실패 ({resource_id}): {e}")
+            return None
+        if not ok:
+            return None
+        lease = Lease(self, resource_id)
+        with self._lock:
+            self._held[resource_id] = lease
+        self._start()
+        return lease
+
+    def release(self, lease):
+        with self._lock:
+            if self._held.get(lease.resource_id) is not lease:
+                return
+            del self._held[lease.resource_id]
+        try:
+            self.backend.release(lease.resource_id, self.owner)
+        except Exception as e:
+            # 못 지워도 만료되면 다른 인스턴스가 회수함
+            print(f"   ⚠️ lease 해제 실패 ({lease.resource_id}): {e}")
+
+    def held(self):
+        with self._lock:
+            return list(self._held)
+
+    # ---- 갱신 (매그니픽 대기 등 오래 걸리는 동안에도 워커와 무관하게 계속) ----
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._renew_loop, name="lease-renew", daemon=True)
+                self._thread.start()
+
+    def _renew_loop(self):
+        while True:
+            time.sleep(self.renew_interval)
+            with self._lock:
+                leases = list(self._held.values())
+            for lease in leases:
+                try:
+                    ok = self.backend.renew(lease.resource_id, self.owner, self.ttl)
+                except Exception as e:
+                    # 일시적 오류는 다음 주기에 다시 시도 (ttl 안에 성공하면 유지)
+                    print(f"   ⚠️ lease 갱신 실패 ({lease.resource_id}): {e}")
+                    continue
+                if not ok:
+                    lease.lost = True
+                    with self._lock:
+                        self._held.pop(lease.resource_id, None)
+                    log_event("lease_lost", resource_id=lease.resource_id, owner=self.owner)
+
+
+def make_lease_backend(name, get_drive_service=None, db_path=None):
+    name = (name or "none").lower()
+    if name == "drive":
+        return DriveLeases(get_drive_service)
+    if name == "sqlite":
+        return SqliteLeases(db_path) if db_path else SqliteLeases()
+    if name == "none":
+        return NullLeases()
+    raise ValueError(f"알 수 없는 LEASE_BACKEND: {name}")
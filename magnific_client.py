@@ -0,0 +1,322 @@
+import asyncio
+import base64
+import hmac
+import io
+import json
+import random
+import secrets
+import threading
+import time
+
+import aiohttp
+from aiohttp import web
+
+from metrics import API_CALLS, BYTES, MAGNIFIC_QUEUE_SECONDS
+
+# ---------------------------------------------------------
+# [매그니픽] 비동기 업스케일 클라이언트
+#  - 세션(커넥션 풀) 1개를 모든 요청이 공유
+#  - 대기열 작업은 지수 백오프 + 지터로 폴링 (여러 task_id를 루프 하나에서 처리)
+#  - 제출(submit)만 과금 -> 상태 조회/다운로드 오류는 같은 task_id/URL로 여기서 다시 시도 (다시 제출하지 않음)
+#  - 선택: 로컬 웹훅 엔드포인트로 완료 통지 받기 (URL에 넣은 비밀 토큰이 맞는 요청만 받음)
+# ---------------------------------------------------------
+MAGNIFIC_ENDPOINT = "https://api.freepik.com/v1/ai/image-upscaler"
+# base64는 3바이트 -> 4글자이므로 3의 배수로 잘라야 조각을 이어 붙여도 올바른 base64가 됨
+B64_CHUNK = 3 * 64 * 1024
+DOWNLOAD_CHUNK = 256 * 1024
+RETRYABLE_DOWNLOAD_STATUS = (408, 429, 500, 502, 503, 504)
+
+DEFAULT_PAYLOAD = {
+    "scale_factor": "2x",
+    "optimized_for": "standard",
+    "prompt": "realistic interior, highly detailed, photorealistic",
+    "creativity": 1,
+    "hdr": 2,
+    "resemblance": 4,
+    "fractality": 2,
+    "engine": "automatic",
+}
+
+
+class MagnificError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+async def _json_with_image(fields, image_bytes):
+    # {"...": ..., "image": "<base64>"} 를 조각 단위로 생성 (전체 base64 문자열/JSON 사본을 만들지 않음)
+    head = json.dumps(fields)[:-1]
+    yield (head + (", " if fields else "") + '"image": "').encode("utf-8")
+    view = memoryview(image_bytes)
+    for start in range(0, len(view), B64_CHUNK):
+        yield base64.b64encode(view[start:start + B64_CHUNK])
+    yield b'"}'
+
+
+def _b64_length(n):
+    return (n + 2) // 3 * 4
+
+
+def _first_generated(data):
+    generated = data.get("generated") or []
+    return generated[0] if generated else None
+
+
+class WebhookReceiver:
+    # Freepik이 작업 완료 시 POST 하는 로컬 콜백 서버
+    #  - 누구나 POST 할 수 있으므로 webhook_url에 붙인 토큰(secret)이 맞는 요청만 믿음
+    #  - 기다리는 쪽이 없는 통지(먼저 도착/forget 이후)는 early_ttl초, 최대 max_early개까지만 보관
+    def __init__(self, host="0.0.0.0", port=8081, path="/magnific/webhook", public_url=None, secret=None,
+                 early_ttl=120, max_early=1000):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret = secret or secrets.token_urlsafe(32)
+        base_url = public_url or f"http://{host}:{port}{path}"
+        self.public_url = f"{base_url}{'&' if '?' in base_url else '?'}token={self.secret}"
+        self.early_ttl = early_ttl
+        self.max_early = max_early
+        self._waiters = {}
+        self._early = {}  # task_id -> (도착 시각, data), 도착 순서
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post(self.path, self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def close(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def expect(self, task_id):
+        future = asyncio.get_running_loop().create_future()
+        self._expire_early()
+        if task_id in self._early:
+            future.set_result(self._early.pop(task_id)[1])
+        else:
+            self._waiters[task_id] = future
+        return future
+
+    def forget(self, task_id):
+        self._waiters.pop(task_id, None)
+
+    def _expire_early(self):
+        cutoff = time.monotonic() - self.early_ttl
+        while self._early:
+            task_id, (arrived, _) = next(iter(self._early.items()))
+            if arrived >= cutoff and len(self._early) <= self.max_early:
+                break
+            del self._early[task_id]
+
+    async def _handle(self, request):
+        if not hmac.compare_digest(request.query.get("token", ""), self.secret):
+            return web.json_response({"error": "forbidden"}, status=403)
+        body = await request.json()
+        data = body.get("data", body)
+        task_id = data.get("task_id")
+        if task_id:
+            future = self._waiters.pop(task_id, None)
+            if future is None:
+                self._early[task_id] = (time.monotonic(), data)
+                self._expire_early()
+            elif not future.done():
+                future.set_result(data)
+        return web.json_response({"ok": True})
+
+
+class MagnificClient:
+    def __init__(self, api_key, endpoint=MAGNIFIC_ENDPOINT, max_connections=10,
+                 poll_initial=1.0, poll_max=15.0, timeout=120, payload=None, webhook=None, download_retries=3):
+        self.api_key = api_key
+        self.endpoint = endpoint.rstrip("/")
+        self.max_connections = max_connections
+        self.poll_initial = poll_initial
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self.payload = dict(payload or DEFAULT_PAYLOAD)
+        self.webhook = webhook
+        self.download_retries = download_retries
+        self._session = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "x-freepik-api-key": self.api_key,
+                    "Accept": "application/json",
+                },
+                timeout=aiohttp.ClientTimeout(total=60),
+            )
+        if self.webhook:
+            await self.webhook.start()
+
+    async def close(self):
+        if self.webhook:
+            await self.webhook.close()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    # ---- API 호출 ----
+    async def submit(self, image_bytes):
+        fields = dict(self.payload)
+        if self.webhook:
+            fields["webhook_url"] = self.webhook.public_url
+        API_CALLS.inc(provider="magnific", operation="submit")
+        BYTES.inc(_b64_length(len(image_bytes)), provider="magnific", direction="out")
+        body = _json_with_image(fields, image_bytes)
+        headers = {"Content-Type": "application/json"}
+        async with self._session.post(self.endpoint, data=body, headers=headers) as res:
+            if res.status == 401:
+                raise MagnificError("[인증 실패] API 키가 틀렸거나 만료되었습니다.", 401)
+            if res.status == 402:
+                raise MagnificError("[결제 필요] 매그니픽 크레딧이 부족합니다.", 402)
+            if res.status != 200:
+                raise MagnificError(f"API 에러 ({res.status}): {await res.text()}", res.status)
+            data = await res.json()
+        if "data" not in data:
+            raise MagnificError(f"[API 응답 이상] {data}")
+        return data["data"]
+
+    async def check(self, task_id):
+        API_CALLS.inc(provider="magnific", operation="status")
+        try:
+            async with self._session.get(f"{self.endpoint}/{task_id}") as res:
+                if res.status != 200:
+                    return None
+                return (await res.json()).get("data", {})
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            # 일시적인 오류는 "아직 모름" -> 다음 폴링에서 다시 확인
+            return None
+
+    async def wait_for_task(self, task_id):
+        start = time.monotonic()
+        try:
+            if self.webhook:
+                return await self._wait_webhook(task_id)
+            return await self._wait_polling(task_id)
+        finally:
+            MAGNIFIC_QUEUE_SECONDS.observe(time.monotonic() - start)
+
+    async def _wait_polling(self, task_id):
+        deadline = time.monotonic() + self.timeout
+        delay = self.poll_initial
+        while time.monotonic() < deadline:
+            # 지터: 같은 시각에 들어간 작업들이 한꺼번에 폴링하지 않도록 분산
+            await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            delay = min(self.poll_max, delay * 2)
+            data = await self.check(task_id)
+            if data is None:
+                continue
+            status = data.get("status")
+            if status == "COMPLETED":
+                return self._completed_url(data)
+            if status == "FAILED":
+                raise MagnificError(f"매그니픽 작업 실패: {data.get('message')}")
+        raise MagnificError(f"대기 시간 초과 ({task_id})")
+
+    async def _wait_webhook(self, task_id):
+        future = self.webhook.expect(task_id)
+        try:
+            data = await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            # 웹훅이 오지 않으면 마지막으로 한 번 직접 확인
+            data = await self.check(task_id) or {}
+        finally:
+            self.webhook.forget(task_id)
+        if data.get("status") == "FAILED":
+            raise MagnificError(f"매그니픽 작업 실패: {data.get('message')}")
+        if data.get("status") != "COMPLETED":
+            raise MagnificError(f"대기 시간 초과 ({task_id})")
+        return self._completed_url(data)
+
+    def _completed_url(self, data):
+        url = _first_generated(data)
+        if not url:
+            raise MagnificError(f"완료됐는데 이미지가 없음: {data}")
+        return url
+
+    async def download(self, url):
+        # 같은 결과 URL을 백오프하며 다시 받음 (다운로드 실패로 작업을 다시 제출해 과금되지 않도록)
+        for attempt in range(self.download_retries + 1):
+            try:
+                return await self._download_once(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError, MagnificError) as e:
+                if isinstance(e, MagnificError) and e.status not in RETRYABLE_DOWNLOAD_STATUS:
+                    raise
+                if attempt == self.download_retries:
+                    if isinstance(e, MagnificError):
+                        raise
+                    raise MagnificError(f"다운로드 실패 ({type(e).__name__}: {e})") from e
+            await asyncio.sleep(self.poll_initial * 2 ** attempt * random.uniform(0.5, 1.0))
+
+    async def _download_once(self, url):
+        API_CALLS.inc(provider="magnific", operation="download")
+        async with self._session.get(url) as res:
+            if res.status != 200:
+                raise MagnificError(f"다운로드 실패 ({res.status})", res.status)
+            # 조각 단위로 버퍼에 바로 기록 (응답 전체를 한 번 더 복사하지 않음)
+            buf = io.BytesIO()
+            async for chunk in res.content.iter_chunked(DOWNLOAD_CHUNK):
+                buf.write(chunk)
+        BYTES.inc(buf.tell(), provider="magnific", direction="in")
+        # getvalue()로 bytes를 다시 만들지 않고 버퍼를 그대로 넘김 (memoryview: len/파일 쓰기/업로드 스트림 모두 가능)
+        return buf.getbuffer()
+
+    async def upscale(self, image_bytes):
+        return await self.finish(await self.submit(image_bytes))
+
+    async def finish(self, data):
+        # 제출 응답 -> (대기열이면 완료까지 대기) -> 결과 다운로드
+        url = _first_generated(data)
+        if url is None:
+            if "task_id" not in data:
+                raise MagnificError(f"이미지 생성 실패 (데이터 없음): {data}")
+            url = await self.wait_for_task(data["task_id"])
+        return await self.download(url)
+
+    async def upscale_many(self, images):
+        return await asyncio.gather(*(self.upscale(b) for b in images), return_exceptions=True)
+
+
+# ---------------------------------------------------------
+# [동기 브리지] 워커 스레드에서 호출할 수 있도록 이벤트 루프를 전용 스레드에서 실행
+# ---------------------------------------------------------
+class BackgroundUpscaler:
+    def __init__(self, client):
+        self.client = client
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="magnific-loop", daemon=True)
+        self._thread.start()
+        self._call(self.client.start())
+
+    def _call(self, coro, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def upscale(self, image_bytes):
+        return self._call(self.client.upscale(image_bytes))
+
+    def submit(self, image_bytes):
+        return self._call(self.client.submit(image_bytes))
+
+    def finish(self, data):
+        return self._call(self.client.finish(data))
+
+    def close(self):
+        self._call(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
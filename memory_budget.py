@@ -0,0 +1,70 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import REGISTRY
+
+# ---------------------------------------------------------
+# [메모리 예산] 동시에 메모리에 올라가는 이미지 바이트 총량 제한
+#  - 작업마다 예상 크기만큼 예약하고, 예산이 차면 다른 작업이 끝날 때까지 대기 (OOM 대신 대기)
+#  - 예산보다 큰 단일 예약은 다른 예약이 모두 끝난 뒤 단독으로 허용 (교착 방지)
+#  - 작업 단위 예약(base=True): 작업이 끝날 때까지 살아 있는 바이트(입력/빈 방/변형). 단계별 예약은
+#    작업 단위 예약만 남았으면 크기와 관계없이 허용 -> 작업 예약을 쥔 채 단계 예약을 기다려도 교착 없음
+# ---------------------------------------------------------
+MEMORY_WAIT_SECONDS = REGISTRY.histogram(
+    "bot_memory_wait_seconds", "Time spent waiting for the image memory budget")
+
+
+class MemoryBudget:
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.in_use = 0
+        self.base_in_use = 0
+        self.waiting = 0
+        self.peak = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, nbytes, base):
+        if self.in_use + nbytes <= self.max_bytes:
+            return True
+        return self.in_use == 0 if base else self.in_use == self.base_in_use
+
+    def acquire(self, nbytes, base=False):
+        nbytes = max(0, int(nbytes))
+        start = time.monotonic()
+        with self._cond:
+            if not self._fits(nbytes, base):
+                self.waiting += 1
+                try:
+                    self._cond.wait_for(lambda: self._fits(nbytes, base))
+                finally:
+                    self.waiting -= 1
+            self.in_use += nbytes
+            if base:
+                self.base_in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+        MEMORY_WAIT_SECONDS.observe(time.monotonic() - start)
+        return nbytes
+
+    def release(self, nbytes, base=False):
+        with self._cond:
+            self.in_use -= nbytes
+            if base:
+                self.base_in_use -= nbytes
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes, base=False):
+        # with BUDGET.reserve(예상 바이트): ... 데이터가 살아 있는 동안 쥐고 있을 것
+        # 단계 예약끼리는 중첩하지 말 것 (같은 스레드가 자기 예약을 기다릴 수 있음) - 작업 예약 안의 단계 예약 1겹은 가능
+        nbytes = self.acquire(nbytes, base)
+        try:
+            yield
+        finally:
+            self.release(nbytes, base)
+
+    def register_gauges(self, prefix="bot_memory_budget"):
+        REGISTRY.gauge(f"{prefix}_bytes", "Image memory budget", lambda: self.max_bytes)
+        REGISTRY.gauge(f"{prefix}_in_use_bytes", "Image bytes currently reserved", lambda: self.in_use)
+        REGISTRY.gauge(f"{prefix}_peak_bytes", "Peak reserved image bytes", lambda: self.peak)
+        REGISTRY.gauge(f"{prefix}_waiting", "Workers waiting for memory budget", lambda: self.waiting)
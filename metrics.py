@@ -0,0 +1,242 @@
+import json
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+# ---------------------------------------------------------
+# [계측] 단계별 소요 시간 / API 호출 / 전송량 집계
+#  - Prometheus 형식 /metrics 엔드포인트
+#  - JSON-lines 이벤트 로그
+# ---------------------------------------------------------
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape(value):
+    # Prometheus 텍스트 형식: 라벨 값 안의 \, ", 줄바꿈은 이스케이프
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # key -> [버킷별 개수..., 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                for i, bound in enumerate(self.buckets):
+                    labels = _label_str(self.labels + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {state[i]}")
+                labels = _label_str(self.labels + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {state[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labels, key)} {state[-2]}")
+                lines.append(f"{self.name}_count{_label_str(self.labels, key)} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._gauges = {}  # name -> (help, 값을 돌려주는 함수)
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help_text, fn):
+        # 조회 시점에 값을 계산하는 게이지 (대기열 길이, 캐시 적중 수 등)
+        self._gauges[name] = (help_text, fn)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, (help_text, fn) in self._gauges.items():
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("bot_stage_seconds", "Stage latency in seconds", labels=("stage",))
+STAGE_TOTAL = REGISTRY.counter("bot_stage_total", "Stage executions by result", labels=("stage", "result"))
+API_CALLS = REGISTRY.counter("bot_api_calls_total", "External API calls", labels=("provider", "operation"))
+API_FAILURES = REGISTRY.counter("bot_api_failures_total", "External API failures", labels=("provider", "reason"))
+BYTES = REGISTRY.counter("bot_bytes_total", "Bytes transferred", labels=("provider", "direction"))
+MAGNIFIC_QUEUE_SECONDS = REGISTRY.histogram(
+    "bot_magnific_queue_seconds", "Time a Magnific task spent queued before completion")
+
+
+# ---------------------------------------------------------
+# JSON-lines 이벤트 로그
+# ---------------------------------------------------------
+EVENT_LOG_PATH = os.path.join("logs", "events.jsonl")  # config.Config.metrics_log -> set_event_log
+_log_lock = threading.Lock()
+
+
+def set_event_log(path):
+    global EVENT_LOG_PATH
+    with _log_lock:
+        EVENT_LOG_PATH = path
+
+
+def log_event(event, **fields):
+    record = {"ts": round(time.time(), 3), "event": event, "thread": threading.current_thread().name}
+    record.update(fields)
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    with _log_lock:
+        folder = os.path.dirname(EVENT_LOG_PATH)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(EVENT_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class timed(ContextDecorator):
+    # with timed("stage"): ...   또는   @timed("stage")
+    def __init__(self, stage, **fields):
+        self.stage = stage
+        self.fields = fields
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        result = "error" if exc_type else "ok"
+        STAGE_SECONDS.observe(elapsed, stage=self.stage)
+        STAGE_TOTAL.inc(stage=self.stage, result=result)
+        fields = dict(self.fields)
+        if exc is not None:
+            fields["error"] = str(exc)
+        log_event("stage", stage=self.stage, seconds=round(elapsed, 3), result=result, **fields)
+        return False
+
+
+# ---------------------------------------------------------
+# HTTP 엔드포인트 (/metrics, /healthz + 관리 포트에서만 add_route로 등록한 경로)
+# ---------------------------------------------------------
+ROUTES = {}  # (method, path) -> fn(request) -> (status, body), start_admin_server에서만 제공
+
+
+def add_route(method, path, fn):
+    # fn은 요청 핸들러를 받음 (request.query, request.read_json(), request.headers, request.client_address)
+    ROUTES[(method, path)] = fn
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def _reply(self, status, body, content_type="application/json; charset=utf-8"):
+        if not isinstance(body, str):
+            body = json.dumps(body, ensure_ascii=False, default=str)
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def _dispatch(self, method):
+        path, _, query = self.path.partition("?")
+        route = self.server.routes.get((method, path))
+        if route is None:
+            return self._reply(404, {"error": "not found"})
+        self.query = {k: v[-1] for k, v in parse_qs(query).items()}
+        try:
+            status, body = route(self)
+        except ValueError as e:
+            status, body = 400, {"error": str(e)}
+        except Exception as e:
+            status, body = 500, {"error": str(e)}
+        self._reply(status, body)
+
+    def do_GET(self):
+        path = self.path.partition("?")[0]
+        if path == "/metrics":
+            return self._reply(200, REGISTRY.render(), "text/plain; version=0.0.4")
+        if path == "/healthz":
+            return self._reply(200, {"ok": True})
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def log_message(self, format, *args):
+        pass  # 요청마다 stdout에 찍지 않음
+
+
+def _serve(port, host, routes, name):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.routes = routes
+    threading.Thread(target=server.serve_forever, name=name, daemon=True).start()
+    return server
+
+
+def start_metrics_server(port, host="0.0.0.0"):
+    # 외부에 여는 포트: /metrics, /healthz만
+    return _serve(port, host, {}, "metrics-http")
+
+
+def start_admin_server(port, host="127.0.0.1"):
+    # add_route로 등록한 경로(/admin/*)는 별도 포트에서만 (기본은 같은 호스트에서만 접속 가능)
+    return _serve(port, host, ROUTES, "admin-http")
@@ -0,0 +1,64 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# ---------------------------------------------------------
+# [무드보드] 인코딩된 이미지 캐시 (경로 조회는 style_catalog)
+#  - 경로별 LRU, 전체 바이트 수로 제한 (assets 전체는 약 95MB라 작은 인스턴스에 다 올리지 않음)
+#  - 파일이 바뀌면(mtime) 같은 경로의 항목을 교체 -> 옛 항목이 남지 않음
+# ---------------------------------------------------------
+MOODBOARD_MAX_SIZE = (2048, 2048)
+MOODBOARD_CACHE_MB = 32  # config.Config.moodboard_cache_mb -> set_cache_size
+
+_cache = OrderedDict()  # path -> (mtime, blob)
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+
+
+def _load_blob(path):
+    with Image.open(path) as img:
+        # 이미 충분히 작은 PNG/JPEG는 디코딩 없이 원본 바이트를 그대로 사용
+        if img.format in ("PNG", "JPEG") and img.width <= MOODBOARD_MAX_SIZE[0] and img.height <= MOODBOARD_MAX_SIZE[1]:
+            with open(path, "rb") as f:
+                return {"mime_type": Image.MIME[img.format], "data": f.read()}
+        img.thumbnail(MOODBOARD_MAX_SIZE)
+        buf = io.BytesIO()
+        img.save(buf, "PNG")
+        return {"mime_type": "image/png", "data": buf.getvalue()}
+
+
+def set_cache_size(megabytes):
+    global MOODBOARD_CACHE_MB
+    MOODBOARD_CACHE_MB = megabytes
+
+
+def _store(path, mtime, blob):
+    global _cache_bytes
+    limit = MOODBOARD_CACHE_MB * 1024 * 1024
+    with _cache_lock:
+        old = _cache.pop(path, None)
+        if old is not None:
+            _cache_bytes -= len(old[1]["data"])
+        if len(blob["data"]) > limit:
+            return
+        _cache[path] = (mtime, blob)
+        _cache_bytes += len(blob["data"])
+        while _cache_bytes > limit:
+            _, (_, evicted) = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted["data"])
+
+
+def load_moodboard(path):
+    # Gemini 입력용 blob ({"mime_type", "data"}) - 파일이 바뀌면 mtime을 보고 다시 읽음
+    mtime = os.stat(path).st_mtime
+    with _cache_lock:
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == mtime:
+            _cache.move_to_end(path)
+            return entry[1]
+    blob = _load_blob(path)
+    _store(path, mtime, blob)
+    return blob
@@ -0,0 +1,78 @@
+import io
+import threading
+
+from PIL import Image, ImageStat
+
+# ---------------------------------------------------------
+# [결과물 품질 검사] 업스케일(크레딧) 전에 로컬에서 빠르게 걸러냄
+#  - blank: 거의 단색인 이미지 (생성 실패)
+#  - unchanged: 빈 방 사진을 그대로 돌려준 경우
+#  - moodboard: 무드보드를 그대로 붙여넣은 경우 (글자 라벨이 같이 찍히는 주된 원인)
+#  - duplicate: 이미 채택한 변형과 거의 같은 이미지
+#  비교는 dHash(64비트 지각 해시)의 해밍 거리로 함
+# ---------------------------------------------------------
+HASH_SIZE = 8
+SAMPLE_SIZE = 64
+
+
+def _gray(data):
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (SAMPLE_SIZE, SAMPLE_SIZE))
+        return img.convert("L").resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BILINEAR)
+
+
+def _dhash(gray):
+    small = gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    px = small.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = px[row * (HASH_SIZE + 1) + col]
+            right = px[row * (HASH_SIZE + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def dhash(data):
+    return _dhash(_gray(data))
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class QualityFilter:
+    def __init__(self, empty_room=None, moodboard=None, min_stddev=8.0, min_distance=3):
+        self.min_stddev = min_stddev
+        self.min_distance = min_distance
+        self._references = {}
+        if empty_room:
+            self._references["unchanged"] = dhash(empty_room)
+        if moodboard:
+            self._references["moodboard"] = dhash(moodboard)
+        self._accepted = []
+        self._lock = threading.Lock()
+
+    def check(self, data):
+        # 통과하면 None, 걸리면 사유 코드 (decode/blank/unchanged/moodboard/duplicate - 메트릭 라벨로도 씀)
+        # 통과한 이미지는 중복 비교 대상으로 기억
+        try:
+            gray = _gray(data)
+        except Exception:
+            return "decode"
+        if ImageStat.Stat(gray).stddev[0] < self.min_stddev:
+            return "blank"
+        h = _dhash(gray)
+        for reason, ref in self._references.items():
+            if hamming(h, ref) < self.min_distance:
+                return reason
+        with self._lock:
+            if any(hamming(h, other) < self.min_distance for other in self._accepted):
+                return "duplicate"
+            self._accepted.append(h)
+        return None
+
+    def accept(self, data):
+        # 장부에서 복구한 변형 등 검사 없이 채택된 이미지를 중복 비교 대상에 추가
+        with self._lock:
+            self._accepted.append(dhash(data))
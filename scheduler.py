@@ -0,0 +1,274 @@
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import log_event, timed
+
+# ---------------------------------------------------------
+# [작업 스케줄러] INBOX 감시(생산자) -> 대기열 -> 워커 N개(소비자)
+# ---------------------------------------------------------
+class Job:
+    def __init__(self, file, scheduler):
+        self.file = file
+        self.file_id = file['id']
+        self.name = file['name']
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self.current_stage = None
+        self.finished_at = None
+        self.error = None
+        self.timings = {}
+        self.held = False
+        self._scheduler = scheduler
+
+    def hold(self):
+        # 작업이 끝나도 release() 전까지는 다시 대기열에 넣지 않음 (예: 보관함 이동 대기)
+        self.held = True
+
+    def release(self):
+        self._scheduler.release(self.file_id)
+
+    @contextmanager
+    def stage(self, name):
+        # 단계별 소요 시간 기록 (작업 단위 + 스케줄러 전체 통계)
+        self.current_stage = name
+        start = time.perf_counter()
+        try:
+            with timed(f"job_{name}", file=self.name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            self._scheduler.record_stage(name, elapsed)
+            self.current_stage = None
+
+    def timing_summary(self):
+        return " | ".join(f"{name} {sec:.1f}s" for name, sec in self.timings.items())
+
+    def describe(self):
+        now = time.time()
+        info = {"file_id": self.file_id, "name": self.name, "stage": self.current_stage,
+                "timings": {k: round(v, 2) for k, v in self.timings.items()}}
+        if self.started_at is None:
+            info["waiting"] = round(now - self.enqueued_at, 1)
+        else:
+            info["wait"] = round(self.started_at - self.enqueued_at, 1)
+            info["elapsed"] = round((self.finished_at or now) - self.started_at, 1)
+        if self.finished_at is not None:
+            info["result"] = "error" if self.error else "ok"
+            info["error"] = self.error
+            info["finished_at"] = round(self.finished_at, 3)
+        return info
+
+
+class JobScheduler:
+    # 운영 중 제어: pause(새 작업 꺼내기 중지) / drain(감시 중지, 대기열만 소진) / resume
+    #             set_workers(워커 수 변경) / wake(감시 주기를 기다리지 않고 바로 조회)
+    def __init__(self, list_files, handle_job, workers=2, poll_interval=10, error_interval=60,
+                 next_interval=None, history=100):
+        self.list_files = list_files
+        self.handle_job = handle_job
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.next_interval = next_interval  # 감시 주기를 동적으로 정할 때 (예: InboxWatcher)
+        self.error_interval = error_interval
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._known = set()      # 대기열 + 처리 중 (중복 등록 방지)
+        self._running = {}       # file_id -> Job
+        self._stage_stats = {}   # stage -> [횟수, 합계, 최대]
+        self._threads = {}       # 워커 번호 -> Thread
+        self._recent = deque(maxlen=history)  # 끝난 작업 (최근 것부터 조회)
+        self._active = threading.Event()      # 해제되면 pause
+        self._active.set()
+        self._wake = threading.Event()
+        self.draining = False
+        self.completed = 0
+        self.failed = 0
+
+    # ---- 생산자 ----
+    def enqueue(self, files):
+        added = 0
+        with self._lock:
+            for file in files:
+                if file['id'] in self._known:
+                    continue
+                self._known.add(file['id'])
+                self._queue.put(Job(file, self))
+                added += 1
+        return added
+
+    def poll_once(self):
+        if self.draining:
+            return 0
+        files = self.list_files()
+        added = self.enqueue(files)
+        status = self.status()
+        print(
+            f"[감시 중] 발견된 파일: {len(files)}개 (신규 {added}) | "
+            f"대기열 {status['queued']} | 처리 중 {status['in_flight']} | 워커 {status['workers']}"
+        )
+        return added
+
+    def run_forever(self):
+        self.start_workers()
+        while True:
+            try:
+                self.poll_once()
+                self._sleep(self.next_interval() if self.next_interval else self.poll_interval)
+            except Exception as e:
+                print(f"\n❌ 봇 에러: {e}")
+                self._sleep(self.error_interval)
+
+    def _sleep(self, seconds):
+        # wake()가 불리면 바로 다음 조회
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def wake(self):
+        self._wake.set()
+
+    def release(self, file_id):
+        with self._lock:
+            self._known.discard(file_id)
+
+    # ---- 운영 중 제어 ----
+    def pause(self):
+        # 처리 중인 작업은 끝까지 진행, 대기열에서 새로 꺼내지만 않음
+        self._active.clear()
+        log_event("scheduler", action="pause")
+
+    def drain(self):
+        # 새 파일은 받지 않고 대기열에 있는 것만 마저 처리 (배포/인스턴스 축소 전)
+        self.draining = True
+        self._active.set()
+        log_event("scheduler", action="drain")
+
+    def resume(self):
+        self.draining = False
+        self._active.set()
+        self.wake()
+        log_event("scheduler", action="resume")
+
+    @property
+    def paused(self):
+        return not self._active.is_set()
+
+    def drained(self):
+        # 대기열 / 처리 중 / 보류(보관함 이동 대기)까지 모두 끝나야 완료
+        with self._lock:
+            return self.draining and not self._known
+
+    def set_workers(self, workers):
+        # 늘리면 바로 스레드 추가, 줄이면 초과분 워커가 지금 작업을 끝낸 뒤 종료
+        with self._lock:
+            self.workers = max(1, int(workers))
+        self.start_workers()
+        log_event("scheduler", action="set_workers", workers=self.workers)
+        return self.workers
+
+    # ---- 소비자 ----
+    def start_workers(self):
+        with self._lock:
+            for n in range(self.workers):
+                thread = self._threads.get(n)
+                if thread is not None and thread.is_alive():
+                    continue
+                thread = threading.Thread(target=self._worker_loop, args=(n,), name=f"job-worker-{n + 1}", daemon=True)
+                self._threads[n] = thread
+                thread.start()
+
+    def _next_job(self, n):
+        # pause 중이면 대기, 워커 수가 줄었으면 None (스레드 종료 - 번호는 다시 늘릴 때 재사용)
+        while True:
+            with self._lock:
+                if n >= self.workers:
+                    self._threads.pop(n, None)
+                    return None
+            if not self._active.wait(timeout=1.0):
+                continue
+            try:
+                return self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def _worker_loop(self, n):
+        while True:
+            job = self._next_job(n)
+            if job is None:
+                return
+            job.started_at = time.time()
+            with self._lock:
+                self._running[job.file_id] = job
+            ok = False
+            try:
+                self.handle_job(job)
+                ok = True
+            except Exception as e:
+                job.error = str(e)
+                print(f"\n❌ 작업 에러 ({job.name}): {e}")
+            finally:
+                job.finished_at = time.time()
+                with self._lock:
+                    if ok:
+                        self.completed += 1
+                    else:
+                        self.failed += 1
+                    self._running.pop(job.file_id, None)
+                    self._recent.appendleft(job)
+                    if not (ok and job.held):
+                        self._known.discard(job.file_id)
+                self._queue.task_done()
+                print(f"   ⏱️ {job.name}: {job.timing_summary()}")
+                log_event("job", file=job.name, file_id=job.file_id, result="ok" if ok else "error",
+                          wait=round(job.started_at - job.enqueued_at, 3),
+                          timings={k: round(v, 3) for k, v in job.timings.items()})
+
+    # ---- 통계 ----
+    def record_stage(self, name, elapsed):
+        with self._lock:
+            stats = self._stage_stats.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+    def status(self):
+        with self._lock:
+            running = [
+                {"file_id": job.file_id, "name": job.name, "stage": job.current_stage,
+                 "elapsed": round(time.time() - job.started_at, 1)}
+                for job in self._running.values()
+            ]
+            stages = {
+                name: {"count": c, "avg": round(total / c, 2), "max": round(mx, 2)}
+                for name, (c, total, mx) in self._stage_stats.items()
+            }
+        return {
+            "queued": self._queue.qsize(),
+            "in_flight": len(running),
+            "held": len(self._known) - len(running) - self._queue.qsize(),
+            "workers": self.workers,
+            "paused": self.paused,
+            "draining": self.draining,
+            "completed": self.completed,
+            "failed": self.failed,
+            "running": running,
+            "stages": stages,
+        }
+
+    def jobs(self, limit=50):
+        # 대기 중 / 처리 중 / 최근 끝난 작업 (단계별 소요 시간 포함)
+        with self._queue.mutex:
+            queued = list(self._queue.queue)[:limit]
+        with self._lock:
+            running = list(self._running.values())
+            recent = list(self._recent)
+        return {
+            "queued": [job.describe() for job in queued],
+            "in_flight": [job.describe() for job in running],
+            "recent": [job.describe() for job in recent[:limit]],
+            "failed": [job.describe() for job in recent if job.error][:limit],
+        }
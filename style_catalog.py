@@ -0,0 +1,186 @@
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+
+from metrics import log_event
+from styles_config import ROOM_STYLES, STYLES
+
+# ---------------------------------------------------------
+# [스타일 카탈로그] styles_config.ROOM_STYLES + assets/<공간>/<스타일>/ 을 시작할 때 한 번 컴파일
+#  - (공간, 스타일, 번호) -> 무드보드 경로 + 가구 배치 프롬프트: dict 조회 한 번
+#  - 표기 차이(대소문자, 공백/밑줄/하이픈, 폴더명 scandinavia/scandinavian)는 별칭으로 흡수
+#  - 목록에 없는 조합은 다운로드/Gemini 호출 전에 거절 (기본값이나 폴더 첫 파일로 대체하지 않음)
+#  - assets 폴더(공간/스타일)의 mtime을 check_interval초에 한 번 확인 -> 무드보드 추가/삭제/이름 변경 시 자동 reload
+#    (바로 반영하려면 python admin.py catalog --reload)
+# ---------------------------------------------------------
+MOODBOARD_EXTS = ('.png', '.jpg')
+
+# 정규화한 이름 -> 정식 이름 (폴더/파일명에 섞여 쓰이는 표기)
+ALIASES = {
+    "scandinavia": "scandinavian",
+}
+
+Route = namedtuple("Route", "room style variant moodboard prompt")
+
+
+class UnknownStyle(ValueError):
+    pass
+
+
+def _key(name):
+    # "Living room" / "living_room" / "LivingRoom" -> "livingroom", "Mid-Century" -> "midcentury"
+    key = re.sub(r"[\s_\-]+", "", str(name).lower())
+    return ALIASES.get(key, key)
+
+
+def room_slug(label):
+    # 파일명/폴더명 표기: "Living room" -> "livingroom"
+    return label.lower().replace(" ", "")
+
+
+def style_slug(label):
+    # 파일명/폴더명 표기: "Mid-Century" -> "mid-century"
+    return label.lower().replace(" ", "-").replace("_", "-")
+
+
+def style_fragment(room_label, style_label, spec):
+    # 스타일별 프롬프트 조각 (STYLES의 prompt / furniture_specs가 비어 있으면 이름만)
+    lines = ["<TARGET STYLE>", f"- ROOM: {room_label}",
+             f"- STYLE: {style_label} (follow the moodboard's furniture, materials and colors)"]
+    spec = spec or {}
+    if spec.get("prompt"):
+        lines.append(spec["prompt"])
+    for item, desc in spec.get("furniture_specs", {}).items():
+        lines.append(f"- {item}: {desc}")
+    return "\n\n" + "\n".join(lines)
+
+
+def _dir_mtimes(root):
+    # 루트 + 공간 폴더 + 스타일 폴더의 mtime (폴더 안 파일이 추가/삭제/이름 변경되면 바뀜)
+    dirs = [root]
+    for room_dir in _subdirs(root).values():
+        dirs.append(room_dir)
+        dirs.extend(_subdirs(room_dir).values())
+    mtimes = {}
+    for path in dirs:
+        try:
+            mtimes[path] = os.stat(path).st_mtime
+        except OSError:
+            continue
+    return mtimes
+
+
+def _subdirs(path):
+    # 정규화한 이름 -> 실제 폴더 경로
+    if not os.path.isdir(path):
+        return {}
+    return {_key(name): os.path.join(path, name)
+            for name in sorted(os.listdir(path)) if os.path.isdir(os.path.join(path, name))}
+
+
+class StyleCatalog:
+    def __init__(self, root="assets", room_styles=ROOM_STYLES, styles=STYLES, base_prompt="", check_interval=30):
+        self.root = root
+        self.room_styles = room_styles
+        self.styles = styles
+        self.base_prompt = base_prompt
+        self.check_interval = check_interval
+        self._reload_lock = threading.Lock()
+        self._check_lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        # mtime은 스캔 전에 기록 (스캔 중에 바뀐 폴더는 다음 확인에서 다시 읽음)
+        mtimes = _dir_mtimes(self.root)
+        rooms, styles, allowed, routes, problems = {}, {}, {}, {}, []
+        room_dirs = _subdirs(self.root)
+        for room_label, style_labels in self.room_styles.items():
+            room = room_slug(room_label)
+            rooms[_key(room_label)] = room
+            allowed[room] = set()
+            style_dirs = _subdirs(room_dirs.pop(_key(room_label), ""))
+            for style_label in style_labels:
+                style = style_slug(style_label)
+                styles[_key(style_label)] = style
+                allowed[room].add(style)
+                style_dir = style_dirs.pop(_key(style_label), None)
+                if style_dir is None:
+                    problems.append(f"무드보드 폴더 없음: {room}/{style}")
+                    continue
+                prompt = self.base_prompt + style_fragment(room_label, style_label, self.styles.get(style_label))
+                for variant, path in self._scan_style_dir(style_dir, problems):
+                    routes[(room, style, variant)] = Route(room, style, variant, path, prompt)
+            problems.extend(f"styles_config에 없는 폴더 (무시): {path}" for path in style_dirs.values())
+        problems.extend(f"styles_config에 없는 폴더 (무시): {path}" for path in room_dirs.values())
+        with self._reload_lock:
+            # 조회 쪽은 잠금 없이 한 번에 바뀐 표를 봄
+            self._tables = (rooms, styles, allowed, routes)
+            self.problems = problems
+            self._mtimes = mtimes
+            self._checked_at = time.monotonic()
+        return self
+
+    def _reload_if_changed(self):
+        # 다른 스레드가 확인 중이면 기다리지 않고 지금 표를 씀
+        if time.monotonic() - self._checked_at < self.check_interval or not self._check_lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = time.monotonic()
+            if _dir_mtimes(self.root) != self._mtimes:
+                self.reload()
+                log_event("catalog_reload", reason="assets_changed", routes=len(self._tables[3]))
+        finally:
+            self._check_lock.release()
+
+    @staticmethod
+    def _scan_style_dir(style_dir, problems):
+        # 번호는 파일명의 첫 숫자 (예: livingroom_modern_4_moodboard (1).png -> 4)
+        found = {}
+        for name in sorted(os.listdir(style_dir)):
+            if not name.lower().endswith(MOODBOARD_EXTS):
+                continue
+            match = re.search(r"\d+", name)
+            if not match:
+                problems.append(f"번호 없는 무드보드 (무시): {os.path.join(style_dir, name)}")
+                continue
+            variant = int(match.group())
+            if variant in found:
+                problems.append(f"번호 중복 (앞 파일 사용): {os.path.join(style_dir, name)}")
+                continue
+            found[variant] = os.path.join(style_dir, name)
+        return sorted(found.items())
+
+    def resolve(self, room, style, variant):
+        # 정상 조합이면 Route, 아니면 UnknownStyle (사유 포함)
+        self._reload_if_changed()
+        rooms, styles, allowed, routes = self._tables
+        if not room or not style:
+            raise UnknownStyle("파일명 형식 오류 (고객_공간_스타일_번호_origin)")
+        room_name = rooms.get(_key(room))
+        if room_name is None:
+            raise UnknownStyle(f"알 수 없는 공간: {room} (가능: {', '.join(allowed)})")
+        style_name = styles.get(_key(style))
+        if style_name is None or style_name not in allowed[room_name]:
+            raise UnknownStyle(f"{room_name}에 없는 스타일: {style} (가능: {', '.join(sorted(allowed[room_name]))})")
+        if not str(variant).isdigit():
+            raise UnknownStyle(f"번호가 숫자가 아님: {variant}")
+        route = routes.get((room_name, style_name, int(variant)))
+        if route is None:
+            raise UnknownStyle(f"무드보드 없음: {room_name}/{style_name}/{int(variant)}")
+        return route
+
+    def summary(self):
+        self._reload_if_changed()
+        rooms, styles, allowed, routes = self._tables
+        variants = {}
+        for room, style, variant in routes:
+            variants.setdefault(room, {}).setdefault(style, []).append(variant)
+        return {
+            "root": self.root,
+            "routes": len(routes),
+            "rooms": {room: {style: sorted(variants.get(room, {}).get(style, []))
+                             for style in sorted(allowed[room])} for room in allowed},
+            "problems": list(self.problems),
+        }
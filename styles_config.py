@@ -32,7 +32,8 @@ ROOM_STYLES = {
     ]
 }
 
-# 하위 호환성을 위한 기존 STYLES (더 이상 사용하지 않지만 유지)
+# 스타일별 가구 배치 프롬프트 조각 (style_catalog에서 사용 - 비어 있으면 스타일 이름만 지정)
+# furniture_specs: {"sofa": "설명", ...} 형식
 STYLES = {
     "French-modern": {
         "prompt": "",